@@ -0,0 +1,43 @@
+"""Add version columns
+
+Revision ID: 0d5e8a6c3f41
+Revises: 7c1f3b9a4d2e
+Create Date: 2026-10-18 12:40:12.604577
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d5e8a6c3f41'
+down_revision = '7c1f3b9a4d2e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'charityproject',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False)
+    )
+    op.add_column(
+        'donation',
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False)
+    )
+
+
+def downgrade():
+    # При пересоздании таблицы в batch-режиме SQLite теряется условие
+    # частичных индексов, поэтому они пересоздаются вручную.
+    for table_name in ('donation', 'charityproject'):
+        op.drop_index(f'ix_{table_name}_open', table_name=table_name)
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_column('version')
+        op.create_index(
+            f'ix_{table_name}_open', table_name,
+            ['fully_invested', 'create_date', 'id'],
+            unique=False,
+            sqlite_where=sa.text('fully_invested = 0'),
+            postgresql_where=sa.text('fully_invested = false'),
+        )
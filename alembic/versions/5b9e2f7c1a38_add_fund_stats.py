@@ -0,0 +1,52 @@
+"""Add fund stats
+
+Revision ID: 5b9e2f7c1a38
+Revises: 0d5e8a6c3f41
+Create Date: 2026-10-18 14:02:27.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b9e2f7c1a38'
+down_revision = '0d5e8a6c3f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'fund_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('project_count', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.Column('open_project_count', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.Column('requested_amount', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.Column('donation_count', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.Column('donated_amount', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.Column('invested_amount', sa.BigInteger(),
+                  server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        'INSERT INTO fund_stats (id, project_count, open_project_count, '
+        'requested_amount, donation_count, donated_amount, invested_amount) '
+        'SELECT 1, '
+        '(SELECT count(*) FROM charityproject), '
+        '(SELECT count(*) FROM charityproject '
+        'WHERE NOT coalesce(fully_invested, false)), '
+        '(SELECT coalesce(sum(full_amount), 0) FROM charityproject), '
+        '(SELECT count(*) FROM donation), '
+        '(SELECT coalesce(sum(full_amount), 0) FROM donation), '
+        '(SELECT coalesce(sum(invested_amount), 0) FROM donation)'
+    )
+
+
+def downgrade():
+    op.drop_table('fund_stats')
@@ -0,0 +1,44 @@
+"""Add allocation indexes
+
+Revision ID: 7c1f3b9a4d2e
+Revises: 2e17275467e2
+Create Date: 2026-10-18 12:05:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c1f3b9a4d2e'
+down_revision = '2e17275467e2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_charityproject_open', 'charityproject',
+        ['fully_invested', 'create_date', 'id'],
+        unique=False,
+        sqlite_where=sa.text('fully_invested = 0'),
+        postgresql_where=sa.text('fully_invested = false'),
+    )
+    op.create_index(
+        'ix_donation_open', 'donation',
+        ['fully_invested', 'create_date', 'id'],
+        unique=False,
+        sqlite_where=sa.text('fully_invested = 0'),
+        postgresql_where=sa.text('fully_invested = false'),
+    )
+    op.create_index(
+        'ix_donation_user_id_create_date', 'donation',
+        ['user_id', 'create_date'],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index('ix_donation_user_id_create_date', table_name='donation')
+    op.drop_index('ix_donation_open', table_name='donation')
+    op.drop_index('ix_charityproject_open', table_name='charityproject')
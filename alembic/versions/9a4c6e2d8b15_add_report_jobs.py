@@ -0,0 +1,39 @@
+"""Add report jobs
+
+Revision ID: 9a4c6e2d8b15
+Revises: 5b9e2f7c1a38
+Create Date: 2026-10-18 16:21:08.402617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4c6e2d8b15'
+down_revision = '5b9e2f7c1a38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'report_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('top', sa.Integer(), nullable=True),
+        sa.Column('url', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('create_date', sa.DateTime(), nullable=False),
+        sa.Column('close_date', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        op.f('ix_report_job_create_date'), 'report_job', ['create_date'],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_report_job_create_date'), table_name='report_job')
+    op.drop_table('report_job')
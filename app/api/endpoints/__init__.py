@@ -1,4 +1,8 @@
+from .allocation import router as allocation_router  # noqa
 from .charity_project import router as charity_project_router  # noqa
 from .donation import router as donation_router  # noqa
+from .export import router as export_router  # noqa
+from .fund_stats import router as fund_stats_router  # noqa
 from .google_api import router as google_api_router  # noqa
+from .metrics import router as metrics_router  # noqa
 from .user import router as user_router  # noqa
\ No newline at end of file
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.validators import (
+    check_charity_project_exists, check_donation_exists, check_donation_owner)
+from app.core.db import get_async_session
+from app.core.user import AuthenticatedUser, current_superuser, current_user
+from app.schemas.allocation import AllocationQueueInfo, AllocationStatus
+from app.services.allocation import allocation_worker
+
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    response_model=AllocationQueueInfo,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_allocation_queue_info():
+    """
+    Только для суперюзеров.
+    Возвращает режим распределения инвестиций и длину очереди.
+    """
+    return AllocationQueueInfo(
+        background=allocation_worker.is_running,
+        pending=len(allocation_worker.pending),
+    )
+
+
+@router.get(
+    '/donation/{donation_id}',
+    response_model=AllocationStatus,
+)
+async def get_donation_allocation_status(
+    donation_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    user: AuthenticatedUser = Depends(current_user),
+):
+    """
+    Для авторизованных пользователей.
+    Возвращает статус распределения своего пожертвования
+    (суперюзерам - любого).
+    """
+    donation = await check_donation_exists(donation_id, session)
+    check_donation_owner(donation, user)
+    return AllocationStatus(
+        status=await allocation_worker.get_status(donation, session)
+    )
+
+
+@router.get(
+    '/charity_project/{charity_project_id}',
+    response_model=AllocationStatus,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_charity_project_allocation_status(
+    charity_project_id: int,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Возвращает статус распределения инвестиций в проект.
+    """
+    charity_project = await check_charity_project_exists(
+        charity_project_id, session
+    )
+    return AllocationStatus(
+        status=await allocation_worker.get_status(charity_project, session)
+    )
@@ -1,21 +1,63 @@
 from datetime import datetime
+from http import HTTPStatus
+from typing import List
 
-from fastapi import APIRouter, Depends
+from fastapi import (
+    APIRouter, Body, Depends, File, HTTPException, Request, UploadFile)
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
 
-from app.core.db import get_async_session
+from app.api.pagination import Pagination, cached_page_response
+from app.core.cache import charity_project_list_cache
+from app.core.config import settings
+from app.core.db import (
+    get_async_read_session, get_async_session, is_replica_session)
 from app.core.user import current_superuser
 from app.crud.charity_project import charity_project_crud
 from app.schemas.charity_project import (
     CharityProjectDB, CharityProjectCreate, CharityProjectUpdate)
-from app.services.investments import make_investments
+from app.models import CharityProject
+from app.services.allocation import allocation_worker
+from app.services.investments import make_batch_investments, make_investments
+from app.services.project_import import parse_projects_csv
 from app.api.validators import (
-    check_charity_project_exists, check_name_duplicate, check_project_is_open,
-    check_amount_is_correct, check_project_has_no_donations)
+    NAME_DUPLICATE, check_charity_project_exists, check_name_duplicate,
+    check_names_duplicate, check_project_is_open, check_amount_is_correct,
+    check_project_has_no_donations)
 
 
 router = APIRouter()
 
+# Сколько раз изменение проекта выполняется заново, если его строку
+# успел изменить параллельный запрос (например, распределение
+# пожертвования) между чтением и записью.
+STALE_PROJECT_ATTEMPTS = 2
+PROJECT_CHANGED = (
+    'Проект изменен параллельным запросом, повторите попытку'
+)
+
+
+async def retry_if_project_changed(change, session: AsyncSession):
+    """
+    Выполняет change() и, если версия строки проекта не совпала
+    при записи, откатывает транзакцию и выполняет change() заново:
+    проект перечитывается, и проверки выполняются со свежими данными.
+    Если конфликт повторяется, возвращает 409.
+    """
+    for _ in range(STALE_PROJECT_ATTEMPTS):
+        try:
+            return await change()
+        except StaleDataError:
+            await session.rollback()
+    raise HTTPException(
+        status_code=HTTPStatus.CONFLICT,
+        detail=PROJECT_CHANGED,
+    )
+
 
 @router.get(
     '/',
@@ -23,14 +65,40 @@ router = APIRouter()
     response_model_exclude_none=True,
 )
 async def get_all_charity_projects(
-    session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     """
     Для всех пользователей.
-    Возвращает список всех проектов.
+    Возвращает страницу списка проектов.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
+    Страницы кэшируются до изменения проектов, ответ содержит ETag,
+    по которому клиент может получить 304 Not Modified.
+    Страница, прочитанная с реплики вскоре после сброса кэша,
+    не кэшируется: реплика могла еще не получить изменения.
     """
-    all_projects = await charity_project_crud.get_multi(session)
-    return all_projects
+    cache_key = f'{pagination.limit}:{pagination.after}'
+    page = await charity_project_list_cache.get(cache_key)
+    if page is None:
+        generation = charity_project_list_cache.generation
+        all_projects = await charity_project_crud.get_multi(
+            session, pagination.limit, pagination.after
+        )
+        content = jsonable_encoder(
+            [CharityProjectDB.from_orm(project) for project in all_projects],
+            exclude_none=True,
+        )
+        page = charity_project_list_cache.make_page(
+            JSONResponse(content).body,
+            pagination.get_next_cursor(all_projects),
+        )
+        if not (
+            is_replica_session(session) and
+            charity_project_list_cache.invalidated_within(settings.replica_lag)
+        ):
+            await charity_project_list_cache.set(cache_key, page, generation)
+    return cached_page_response(page, request)
 
 
 @router.post(
@@ -47,20 +115,118 @@ async def create_new_charity_project(
     Только для суперюзеров.
     Создает новый проект и вносит в него пожертвования,
     если есть нераспределенные деньги.
+    В режиме фонового распределения только сохраняет проект
+    и ставит его в очередь на распределение.
     """
     await check_name_duplicate(charity_project.name, session)
     new_project = await charity_project_crud.create_db_object(
         charity_project
     )
-    new_project, donations_updated = await make_investments(
-        new_project, session
-    )
+    if allocation_worker.is_running:
+        new_project = await charity_project_crud.commit_creation(
+            new_project, session
+        )
+        await charity_project_list_cache.invalidate()
+        allocation_worker.enqueue(new_project)
+        return new_project
+    new_project = await make_investments(new_project, session)
     new_project = await charity_project_crud.commit_creation(
-        new_project, donations_updated, session
+        new_project, session
     )
+    await charity_project_list_cache.invalidate()
     return new_project
 
 
+async def create_charity_projects(
+    projects: List[CharityProjectCreate],
+    session: AsyncSession,
+) -> List[CharityProject]:
+    """
+    Создает проекты одним INSERT и за один проход распределяет
+    между ними нераспределенные пожертвования в порядке создания.
+    """
+    if not 1 <= len(projects) <= settings.batch_max_size:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=(
+                'Число проектов должно быть от 1 до '
+                f'{settings.batch_max_size}'
+            ),
+        )
+    await check_names_duplicate(
+        [project.name for project in projects], session
+    )
+    new_projects = [
+        await charity_project_crud.create_db_object(project)
+        for project in projects
+    ]
+    if not allocation_worker.is_running:
+        new_projects = await make_batch_investments(new_projects, session)
+    try:
+        new_projects = await charity_project_crud.commit_bulk_creation(
+            new_projects, session
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=NAME_DUPLICATE,
+        )
+    await charity_project_list_cache.invalidate()
+    if allocation_worker.is_running:
+        for new_project in new_projects:
+            allocation_worker.enqueue(new_project)
+    return new_projects
+
+
+@router.post(
+    '/import',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_charity_projects(
+    projects: List[CharityProjectCreate] = Body(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Создает список проектов одной транзакцией и вносит в них
+    нераспределенные пожертвования в порядке списка.
+    """
+    return await create_charity_projects(projects, session)
+
+
+@router.post(
+    '/import/csv',
+    response_model=list[CharityProjectDB],
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def import_charity_projects_csv(
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Создает проекты из CSV-файла с колонками name, description,
+    full_amount так же, как импорт списка в JSON.
+    """
+    try:
+        projects = parse_projects_csv(await file.read())
+    except ValidationError as error:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=error.errors(),
+        )
+    except ValueError as error:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=str(error),
+        )
+    return await create_charity_projects(projects, session)
+
+
 @router.patch(
     '/{charity_project_id}',
     response_model=CharityProjectDB,
@@ -74,22 +240,35 @@ async def partially_update_charity_project(
     """
     Только для суперюзеров.
     Вносит изменения в разрешенные поля существующего проекта.
+    Уникальность названия проверяет ограничение БД.
     """
-    charity_project = await check_charity_project_exists(
-        charity_project_id, session
-    )
-    await check_project_is_open(charity_project)
-    if obj_in.name is not None:
-        await check_name_duplicate(obj_in.name, session)
-    if obj_in.full_amount is not None:
-        await check_amount_is_correct(charity_project, obj_in.full_amount)
-        if obj_in.full_amount == charity_project.invested_amount:
-            charity_project.fully_invested = True
-            charity_project.close_date = datetime.utcnow()
-
-    charity_project = await charity_project_crud.update(
-        charity_project, obj_in, session
-    )
+    async def update_project():
+        charity_project = await check_charity_project_exists(
+            charity_project_id, session
+        )
+        await check_project_is_open(charity_project)
+        if obj_in.full_amount is not None:
+            await check_amount_is_correct(
+                charity_project, obj_in.full_amount
+            )
+            if obj_in.full_amount == charity_project.invested_amount:
+                charity_project.fully_invested = True
+                charity_project.close_date = datetime.utcnow()
+        return await charity_project_crud.update(
+            charity_project, obj_in, session
+        )
+
+    try:
+        charity_project = await retry_if_project_changed(
+            update_project, session
+        )
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=NAME_DUPLICATE,
+        )
+    await charity_project_list_cache.invalidate()
     return charity_project
 
 
@@ -106,11 +285,15 @@ async def remove_charity_project(
     Только для суперюзеров.
     Удаляет проект, при условии что на него не были выделены инвестиции.
     """
-    charity_project = await check_charity_project_exists(
-        charity_project_id, session
-    )
-    await check_project_has_no_donations(charity_project)
-    charity_project = await charity_project_crud.remove(
-        charity_project, session
+    async def remove_project():
+        charity_project = await check_charity_project_exists(
+            charity_project_id, session
+        )
+        await check_project_has_no_donations(charity_project)
+        return await charity_project_crud.remove(charity_project, session)
+
+    charity_project = await retry_if_project_changed(
+        remove_project, session
     )
+    await charity_project_list_cache.invalidate()
     return charity_project
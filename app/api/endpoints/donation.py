@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends
+from typing import List
+
+from fastapi import APIRouter, Body, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
-from app.core.user import current_user, current_superuser
+from app.api.pagination import Pagination
+from app.core.cache import invalidate_projects_cache
+from app.core.config import settings
+from app.core.db import get_async_read_session, get_async_session
+from app.core.user import AuthenticatedUser, current_user, current_superuser
 from app.crud.donation import donation_crud
-from app.models import User
 from app.schemas.donation import DonationDB, DonationCreate
-from app.services.investments import make_investments
+from app.services.allocation import allocation_worker
+from app.services.investments import (
+    make_batch_investments, make_investments)
 
 
 router = APIRouter()
@@ -23,25 +29,72 @@ router = APIRouter()
 async def create_donation(
     donation: DonationCreate,
     session: AsyncSession = Depends(get_async_session),
-    user: User = Depends(current_user),
+    user: AuthenticatedUser = Depends(current_user),
 ):
     """
     Для авторизованных пользователей.
     Создает новое пожертвование и инвестирует его в проекты,
     если есть открытые.
+    В режиме фонового распределения только сохраняет пожертвование
+    и ставит его в очередь на распределение.
     """
     new_donation = await donation_crud.create_db_object(
         donation, user
     )
-    new_donation, projects_updated = await make_investments(
-        new_donation, session
-    )
+    if allocation_worker.is_running:
+        new_donation = await donation_crud.commit_creation(
+            new_donation, session
+        )
+        allocation_worker.enqueue(new_donation)
+        return new_donation
+    new_donation = await make_investments(new_donation, session)
     new_donation = await donation_crud.commit_creation(
-        new_donation, projects_updated, session
+        new_donation, session
     )
+    await invalidate_projects_cache(session)
     return new_donation
 
 
+@router.post(
+    '/batch',
+    response_model=list[DonationDB],
+    response_model_exclude_none=True,
+    response_model_exclude={
+        'user_id', 'invested_amount', 'fully_invested', 'close_date'
+    },
+)
+async def create_donations_batch(
+    donations: List[DonationCreate] = Body(
+        ..., min_items=1, max_items=settings.batch_max_size
+    ),
+    session: AsyncSession = Depends(get_async_session),
+    user: AuthenticatedUser = Depends(current_user),
+):
+    """
+    Для авторизованных пользователей.
+    Создает пачку пожертвований одним запросом к БД и инвестирует их
+    в открытые проекты за один проход в одной транзакции.
+    Результат совпадает с созданием пожертвований по очереди.
+    """
+    new_donations = [
+        await donation_crud.create_db_object(donation, user)
+        for donation in donations
+    ]
+    if allocation_worker.is_running:
+        new_donations = await donation_crud.commit_bulk_creation(
+            new_donations, session
+        )
+        for new_donation in new_donations:
+            allocation_worker.enqueue(new_donation)
+        return new_donations
+    new_donations = await make_batch_investments(new_donations, session)
+    new_donations = await donation_crud.commit_bulk_creation(
+        new_donations, session
+    )
+    await invalidate_projects_cache(session)
+    return new_donations
+
+
 @router.get(
     '/',
     response_model=list[DonationDB],
@@ -49,13 +102,19 @@ async def create_donation(
     dependencies=[Depends(current_superuser)],
 )
 async def get_all_donations(
-    session: AsyncSession = Depends(get_async_session),
+    response: Response,
+    pagination: Pagination = Depends(),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     """
     Только для суперюзеров.
-    Возвращает список всех пожертвований.
+    Возвращает страницу списка пожертвований.
+    Курсор следующей страницы передается в заголовке X-Next-Cursor.
     """
-    all_donations = await donation_crud.get_multi(session)
+    all_donations = await donation_crud.get_multi(
+        session, pagination.limit, pagination.after
+    )
+    pagination.set_next_cursor(response, all_donations)
     return all_donations
 
 
@@ -67,8 +126,8 @@ async def get_all_donations(
     },
 )
 async def get_my_donations(
-    user: User = Depends(current_user),
-    session: AsyncSession = Depends(get_async_session),
+    user: AuthenticatedUser = Depends(current_user),
+    session: AsyncSession = Depends(get_async_read_session),
 ):
     """
     Для авторизованных пользователей.
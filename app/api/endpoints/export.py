@@ -0,0 +1,128 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.validators import check_export_format_available
+from app.core.db import get_async_read_session, get_async_session
+from app.core.user import current_superuser
+from app.crud.base import CRUDBase
+from app.crud.charity_project import REPORT_COLUMNS, charity_project_crud
+from app.crud.donation import donation_crud
+from app.schemas.charity_project import CharityProjectDB
+from app.schemas.donation import DonationDB
+from app.services.export import MEDIA_TYPES, ExportFormat, render_export
+
+
+router = APIRouter()
+
+
+def export_response(
+    rows,
+    columns,
+    column_types,
+    filename: str,
+    export_format: ExportFormat,
+) -> StreamingResponse:
+    """Формирует потоковый ответ с выгрузкой строк в запрошенном формате."""
+    check_export_format_available(export_format)
+    return StreamingResponse(
+        render_export(export_format, columns, rows, column_types),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            'Content-Disposition':
+                f'attachment; filename={filename}.{export_format.value}'
+        },
+    )
+
+
+def stream_export(
+    crud: CRUDBase,
+    columns,
+    filename: str,
+    export_format: ExportFormat,
+    date_from: Optional[datetime],
+    date_to: Optional[datetime],
+    fully_invested: Optional[bool],
+    session: AsyncSession,
+) -> StreamingResponse:
+    """Формирует потоковый ответ с выгрузкой объектов модели."""
+    columns = list(columns)
+    rows = crud.stream_rows(
+        session, columns, date_from, date_to, fully_invested
+    )
+    return export_response(
+        rows, columns, crud.get_column_types(columns),
+        filename, export_format,
+    )
+
+
+@router.get(
+    '/donations',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_donations(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fully_invested: Optional[bool] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Потоково выгружает пожертвования в формате NDJSON, CSV,
+    XLSX или Parquet
+    с фильтрами по дате создания и статусу.
+    """
+    return stream_export(
+        donation_crud, DonationDB.__fields__, 'donations', export_format,
+        date_from, date_to, fully_invested, session,
+    )
+
+
+@router.get(
+    '/charity_projects',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_charity_projects(
+    export_format: ExportFormat = Query(ExportFormat.ndjson, alias='format'),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    fully_invested: Optional[bool] = None,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Потоково выгружает проекты в формате NDJSON, CSV,
+    XLSX или Parquet
+    с фильтрами по дате создания и статусу.
+    """
+    return stream_export(
+        charity_project_crud, CharityProjectDB.__fields__,
+        'charity_projects', export_format,
+        date_from, date_to, fully_invested, session,
+    )
+
+
+@router.get(
+    '/report',
+    dependencies=[Depends(current_superuser)],
+)
+async def export_report(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias='format'),
+    top: Optional[int] = Query(None, ge=1),
+    session: AsyncSession = Depends(get_async_read_session),
+):
+    """
+    Только для суперюзеров.
+    Потоково выгружает тот же отчет о закрытых проектах,
+    что и google-отчет, без обращения к Google:
+    в формате CSV, NDJSON, XLSX или Parquet.
+    """
+    rows = charity_project_crud.stream_report_rows(session, limit=top)
+    return export_response(
+        rows, REPORT_COLUMNS, [str] * len(REPORT_COLUMNS),
+        'report', export_format,
+    )
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import get_async_session
+from app.core.user import current_superuser
+from app.crud.fund_stats import fund_stats_crud
+from app.schemas.fund_stats import FundStatsCheck, FundStatsDB
+
+
+router = APIRouter()
+
+
+@router.get(
+    '/',
+    response_model=FundStatsDB,
+)
+async def get_fund_stats(
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Для всех пользователей.
+    Возвращает итоги фонда: число проектов и пожертвований,
+    собранные, вложенные и нераспределенные суммы.
+    """
+    return await fund_stats_crud.get_current(session)
+
+
+@router.get(
+    '/check',
+    response_model=FundStatsCheck,
+    dependencies=[Depends(current_superuser)],
+)
+async def check_fund_stats(
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Сверяет статистику фонда с проектами и пожертвованиями.
+    """
+    mismatches = await fund_stats_crud.check(session)
+    return FundStatsCheck(consistent=not mismatches, mismatches=mismatches)
+
+
+@router.post(
+    '/rebuild',
+    response_model=FundStatsDB,
+    dependencies=[Depends(current_superuser)],
+)
+async def rebuild_fund_stats(
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Только для суперюзеров.
+    Пересчитывает статистику фонда с нуля.
+    """
+    return await fund_stats_crud.rebuild(session)
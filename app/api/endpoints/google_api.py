@@ -1,42 +1,73 @@
-from urllib.parse import urljoin
+from http import HTTPStatus
+from typing import Optional
 
 from aiogoogle import Aiogoogle
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_async_session
+from app.core.db import get_async_read_session
 from app.core.google_client import get_service
 from app.core.user import current_superuser
-
-from app.crud.charity_project import charity_project_crud
-from app.services.google_api import (
-    spreadsheets_create, set_user_permissions, spreadsheets_update_value)
+from app.schemas.report import ReportJobDB
+from app.services.reports import build_report, report_jobs
 
 
 router = APIRouter()
 
-SPREADSHEETS_URL = 'https://docs.google.com/spreadsheets/d/'
-
 
 @router.get(
     '/',
     dependencies=[Depends(current_superuser)],
 )
 async def get_report(
-        session: AsyncSession = Depends(get_async_session),
+        top: Optional[int] = Query(None, ge=1),
+        session: AsyncSession = Depends(get_async_read_session),
         wrapper_services: Aiogoogle = Depends(get_service)
 ) -> str:
     """
     Только для суперюзеров.
     Создает google-отчет со списком закрытых проектов,
     отсортированных в порядке времени, ушедшего на их закрытие.
+    В отчет попадают top самых быстро закрытых проектов
+    или все закрытые проекты, если top не указан.
+    """
+    return await build_report(session, wrapper_services, top)
+
+
+@router.post(
+    '/jobs',
+    response_model=ReportJobDB,
+    response_model_exclude_none=True,
+    status_code=HTTPStatus.ACCEPTED,
+    dependencies=[Depends(current_superuser)],
+)
+async def create_report_job(
+        top: Optional[int] = Query(None, ge=1),
+):
+    """
+    Только для суперюзеров.
+    Ставит формирование google-отчета в фоновую задачу
+    и сразу возвращает ее id для опроса статуса.
+    """
+    return await report_jobs.create(top)
+
+
+@router.get(
+    '/jobs/{job_id}',
+    response_model=ReportJobDB,
+    response_model_exclude_none=True,
+    dependencies=[Depends(current_superuser)],
+)
+async def get_report_job(job_id: str):
+    """
+    Только для суперюзеров.
+    Возвращает статус задачи на формирование отчета
+    и ссылку на готовый документ.
     """
-    closed_projects = await charity_project_crud.get_projects_by_completion_rate(
-        session
-    )
-    spreadsheet_id = await spreadsheets_create(wrapper_services)
-    await set_user_permissions(spreadsheet_id, wrapper_services)
-    await spreadsheets_update_value(spreadsheet_id,
-                                    closed_projects,
-                                    wrapper_services)
-    return urljoin(SPREADSHEETS_URL, spreadsheet_id)
+    job = await report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Задача не найдена'
+        )
+    return job
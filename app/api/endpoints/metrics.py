@@ -0,0 +1,33 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.metrics import request_metrics
+
+
+router = APIRouter()
+
+PROMETHEUS_MEDIA_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@router.get(
+    '/metrics',
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+async def get_metrics():
+    """
+    Гистограммы времени запросов, времени и числа SQL-запросов
+    по маршрутам в формате Prometheus.
+    Доступно, только если включен settings.metrics_enabled.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Метрики отключены'
+        )
+    return PlainTextResponse(
+        request_metrics.render(), media_type=PROMETHEUS_MEDIA_TYPE
+    )
@@ -0,0 +1,59 @@
+from http import HTTPStatus
+from typing import Optional, Sequence
+
+from fastapi import Query, Request, Response
+
+from app.core.cache import CachedPage, etag_matches
+from app.core.config import settings
+
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class Pagination:
+    """
+    Параметры постраничной выдачи списков:
+    limit - размер страницы,
+    after - курсор, id последнего объекта предыдущей страницы.
+    """
+
+    def __init__(
+        self,
+        limit: int = Query(
+            settings.page_size, ge=1, le=settings.max_page_size
+        ),
+        after: Optional[int] = Query(None, ge=0),
+    ):
+        self.limit = limit
+        self.after = after
+
+    def get_next_cursor(self, objs: Sequence) -> Optional[str]:
+        """
+        Возвращает курсор следующей страницы,
+        если текущая страница заполнена целиком.
+        """
+        if len(objs) == self.limit:
+            return str(objs[-1].id)
+        return None
+
+    def set_next_cursor(self, response: Response, objs: Sequence) -> None:
+        """Передает курсор следующей страницы в заголовке ответа."""
+        next_cursor = self.get_next_cursor(objs)
+        if next_cursor is not None:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+
+def cached_page_response(page: CachedPage, request: Request) -> Response:
+    """
+    Формирует ответ из закэшированной страницы списка.
+    Если клиент прислал актуальный ETag в If-None-Match,
+    возвращает 304 без тела.
+    """
+    headers = {'ETag': page.etag}
+    if page.next_cursor is not None:
+        headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if etag_matches(request.headers.get('if-none-match'), page.etag):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(
+        content=page.body, media_type='application/json', headers=headers
+    )
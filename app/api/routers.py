@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
 from app.api.endpoints import (
-    user_router, charity_project_router, donation_router, google_api_router)
+    user_router, charity_project_router, donation_router, google_api_router,
+    allocation_router, export_router, fund_stats_router, metrics_router)
 
 
 main_router = APIRouter()
@@ -20,4 +21,23 @@ main_router.include_router(
     prefix='/google',
     tags=['Google']
 )
+main_router.include_router(
+    export_router,
+    prefix='/export',
+    tags=['Export']
+)
+main_router.include_router(
+    allocation_router,
+    prefix='/allocation',
+    tags=['Allocation']
+)
+main_router.include_router(
+    fund_stats_router,
+    prefix='/stats',
+    tags=['Stats']
+)
+main_router.include_router(
+    metrics_router,
+    tags=['Metrics']
+)
 main_router.include_router(user_router)
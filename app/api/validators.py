@@ -1,10 +1,16 @@
 from http import HTTPStatus
+from typing import List
 
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.user import AuthenticatedUser
 from app.crud.charity_project import charity_project_crud
-from app.models import CharityProject
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation
+from app.services.export import ExportFormat, get_missing_dependency
+
+NAME_DUPLICATE = 'Проект с таким именем уже существует!'
 
 
 async def check_charity_project_exists(
@@ -23,6 +29,38 @@ async def check_charity_project_exists(
     return charity_project
 
 
+async def check_donation_exists(
+        donation_id: int,
+        session: AsyncSession,
+) -> Donation:
+    """
+    Проверяет, существует ли пожертвование с указанным id,
+    и возвращает его.
+    """
+    donation = await donation_crud.get(donation_id, session)
+    if donation is None:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='Пожертвование не найдено'
+        )
+    return donation
+
+
+def check_donation_owner(
+    donation: Donation,
+    user: AuthenticatedUser,
+) -> None:
+    """
+    Проверяет, что пожертвование сделал пользователь
+    или что пользователь - суперюзер.
+    """
+    if donation.user_id != user.id and not user.is_superuser:
+        raise HTTPException(
+            status_code=HTTPStatus.FORBIDDEN,
+            detail='Нельзя просматривать чужие пожертвования',
+        )
+
+
 async def check_name_duplicate(
         project_name: str,
         session: AsyncSession,
@@ -34,7 +72,28 @@ async def check_name_duplicate(
     if project_id is not None:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
-            detail='Проект с таким именем уже существует!',
+            detail=NAME_DUPLICATE,
+        )
+
+
+async def check_names_duplicate(
+        project_names: List[str],
+        session: AsyncSession,
+) -> None:
+    """
+    Проверяет одним запросом, что названия новых проектов
+    не повторяются ни между собой, ни с уже существующими.
+    """
+    duplicates = {
+        name for name in project_names if project_names.count(name) > 1
+    }
+    duplicates.update(
+        await charity_project_crud.get_existing_names(project_names, session)
+    )
+    if duplicates:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'{NAME_DUPLICATE} ({", ".join(sorted(duplicates))})',
         )
 
 
@@ -73,3 +132,16 @@ async def check_amount_is_correct(
             status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
             detail='Требуемая сумма не может быть ниже фактически внесенной',
         )
+
+
+def check_export_format_available(export_format: ExportFormat) -> None:
+    """Проверяет, установлен ли пакет, нужный для формата выгрузки."""
+    package = get_missing_dependency(export_format)
+    if package is not None:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=(
+                f'Формат {export_format.value} недоступен: '
+                f'не установлен пакет {package}'
+            ),
+        )
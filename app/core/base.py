@@ -1,3 +1,5 @@
 """Импорты класса Base и всех моделей для Alembic."""
 from app.core.db import Base  # noqa
-from app.models import User, Donation, CharityProject, CharityAbstractBase  # noqa
+from app.models import (  # noqa
+    User, Donation, CharityProject, CharityAbstractBase, FundStats,
+    ReportJob)
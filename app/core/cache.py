@@ -0,0 +1,130 @@
+import hashlib
+import time
+from typing import NamedTuple, Optional
+
+from cachetools import TTLCache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+PROJECTS_CHANGED = 'charity_projects_changed'
+
+
+class CachedPage(NamedTuple):
+    """Готовый к отправке ответ со страницей списка."""
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+
+class CacheBackend:
+    """
+    Интерфейс хранилища кэша.
+    Методы асинхронные, чтобы хранилище в памяти процесса
+    можно было заменить внешним (например, Redis).
+    """
+
+    async def get(self, key: str) -> Optional[CachedPage]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: CachedPage) -> None:
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryCacheBackend(CacheBackend):
+    """LRU-кэш с ограниченным временем жизни записей в памяти процесса."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.storage = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> Optional[CachedPage]:
+        return self.storage.get(key)
+
+    async def set(self, key: str, value: CachedPage) -> None:
+        self.storage[key] = value
+
+    async def clear(self) -> None:
+        self.storage.clear()
+
+
+class ListCache:
+    """
+    Кэш страниц списка объектов.
+    Хранилище можно заменить, присвоив атрибуту backend
+    другую реализацию CacheBackend.
+    Поколение кэша увеличивается при каждом сбросе: страница,
+    прочитанная из БД до сброса, в кэш уже не попадет.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.generation = 0
+        self.invalidated_at: Optional[float] = None
+
+    @staticmethod
+    def make_page(body: bytes, next_cursor: Optional[str]) -> CachedPage:
+        """Упаковывает тело ответа вместе с его ETag."""
+        etag = '"{}"'.format(hashlib.sha1(body).hexdigest())
+        return CachedPage(body, etag, next_cursor)
+
+    async def get(self, key: str) -> Optional[CachedPage]:
+        return await self.backend.get(key)
+
+    async def set(
+        self, key: str, page: CachedPage, generation: int
+    ) -> None:
+        """
+        Сохраняет страницу, если кэш не сбрасывался
+        с момента начала ее чтения из БД.
+        """
+        if generation == self.generation:
+            await self.backend.set(key, page)
+
+    async def invalidate(self) -> None:
+        self.generation += 1
+        self.invalidated_at = time.monotonic()
+        await self.backend.clear()
+
+    def invalidated_within(self, seconds: float) -> bool:
+        """Проверяет, сбрасывался ли кэш за последние seconds секунд."""
+        return (
+            self.invalidated_at is not None and
+            time.monotonic() - self.invalidated_at < seconds
+        )
+
+
+charity_project_list_cache = ListCache(
+    MemoryCacheBackend(settings.cache_maxsize, settings.cache_ttl)
+)
+
+
+def mark_projects_changed(session: AsyncSession) -> None:
+    """
+    Отмечает, что в транзакции сессии изменились проекты,
+    и после фиксации кэш списка проектов нужно сбросить.
+    """
+    session.info[PROJECTS_CHANGED] = True
+
+
+async def invalidate_projects_cache(session: AsyncSession) -> None:
+    """
+    Сбрасывает кэш списка проектов, если в зафиксированной
+    транзакции сессии изменялись проекты.
+    """
+    if session.info.pop(PROJECTS_CHANGED, False):
+        await charity_project_list_cache.invalidate()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Проверяет, совпадает ли ETag с заголовком If-None-Match."""
+    if if_none_match is None:
+        return False
+    candidates = {
+        candidate.strip().removeprefix('W/')
+        for candidate in if_none_match.split(',')
+    }
+    return etag in candidates or '*' in candidates
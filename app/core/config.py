@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseSettings
 
@@ -7,7 +7,31 @@ class Settings(BaseSettings):
     app_title: str = 'QR_Kot'
     app_description: str = 'Добрый сервис для помощи котикам'
     database_url: str = 'sqlite+aiosqlite:///./fastapi.db'
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_pre_ping: bool = False
+    pool_recycle: int = -1
+    replica_url: Optional[str] = None
+    replica_lag: float = 5
+    sqlite_journal_mode: str = 'WAL'
+    sqlite_synchronous: str = 'NORMAL'
+    sqlite_busy_timeout: int = 5000
+    sqlite_mmap_size: int = 268435456
     secret_key: str = 'SECRET'
+    page_size: int = 100
+    max_page_size: int = 1000
+    cache_ttl: int = 60
+    cache_maxsize: int = 1024
+    auth_cache_ttl: int = 60
+    auth_cache_maxsize: int = 10000
+    allocation_in_background: bool = False
+    allocation_batch_size: int = 100
+    batch_max_size: int = 500
+    report_job_ttl: int = 3600
+    report_job_storage: Literal['memory', 'database'] = 'memory'
+    google_discovery_cache_dir: Optional[str] = None
+    metrics_enabled: bool = False
+    trace_file: Optional[str] = None
     type: Optional[str] = None
     project_id: Optional[str] = None
     private_key_id: Optional[str] = None
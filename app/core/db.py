@@ -1,6 +1,20 @@
-from sqlalchemy import Column, Integer
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, declared_attr, sessionmaker
+import asyncio
+import hashlib
+import weakref
+from typing import Optional
+
+from cachetools import TTLCache
+from fastapi import Depends, Request
+from sqlalchemy import Column, Integer, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine, AsyncSession, create_async_engine
+)
+from sqlalchemy.orm import (
+    Session, declarative_base, declared_attr, sessionmaker
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import Headers
 
 from app.core.config import settings
 
@@ -16,12 +30,196 @@ class PreBase:
 
 Base = declarative_base(cls=PreBase)
 
-engine = create_async_engine(settings.database_url)
 
-AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession)
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Настраивает новое соединение с SQLite: журнал WAL позволяет читать
+    во время записи, synchronous=NORMAL в режиме WAL не теряет
+    целостность при сбое, busy_timeout задает ожидание блокировки,
+    а mmap_size - объем файла, читаемого через отображение в память.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f'PRAGMA journal_mode={settings.sqlite_journal_mode}')
+    cursor.execute(f'PRAGMA synchronous={settings.sqlite_synchronous}')
+    cursor.execute(f'PRAGMA busy_timeout={settings.sqlite_busy_timeout:d}')
+    cursor.execute(f'PRAGMA mmap_size={settings.sqlite_mmap_size:d}')
+    cursor.close()
+
+
+def make_engine(database_url: str) -> AsyncEngine:
+    """
+    Создает движок БД с настройками пула соединений из settings.
+    Для файла SQLite SQLAlchemy по умолчанию открывает соединение
+    на каждую сессию (NullPool), поэтому пул задается явно:
+    соединения и их настройки (set_sqlite_pragmas) переиспользуются.
+    SQLite в памяти остается со своим пулом по умолчанию.
+    """
+    options = {
+        'pool_pre_ping': settings.pool_pre_ping,
+        'pool_recycle': settings.pool_recycle,
+        'pool_size': settings.pool_size,
+        'max_overflow': settings.pool_max_overflow,
+    }
+    url = make_url(database_url)
+    is_sqlite = url.get_backend_name() == 'sqlite'
+    if is_sqlite:
+        if url.database in (None, '', ':memory:'):
+            del options['pool_size'], options['max_overflow']
+        else:
+            options['poolclass'] = AsyncAdaptedQueuePool
+    db_engine = create_async_engine(database_url, **options)
+    if is_sqlite:
+        event.listen(db_engine.sync_engine, 'connect', set_sqlite_pragmas)
+    return db_engine
+
+
+engine = make_engine(settings.database_url)
+
+# Объекты не сбрасываются при фиксации: id и значения по умолчанию
+# заполняются при INSERT, поэтому повторно читать строку не нужно.
+AsyncSessionLocal = sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False
+)
+
+REPLICA_SESSION = 'replica'
+
+read_engine = (
+    make_engine(settings.replica_url) if settings.replica_url else None
+)
+
+AsyncReadSessionLocal = (
+    sessionmaker(
+        read_engine, class_=AsyncSession, info={REPLICA_SESSION: True}
+    ) if read_engine is not None else None
+)
 
 
 async def get_async_session():
     """Асинхронный генератор сессий."""
     async with AsyncSessionLocal() as async_session:
         yield async_session
+
+
+class ReplicaLagGuard:
+    """
+    Помнит клиентов, которые недавно писали в основную БД.
+    Пока реплика может отставать (settings.replica_lag секунд),
+    их чтения направляются в основную БД, чтобы клиент увидел
+    свои изменения. Клиент определяется по заголовку Authorization.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.recent_writers = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def get_key(authorization: str) -> str:
+        return hashlib.sha1(authorization.encode()).hexdigest()
+
+    def mark_write(self, authorization: Optional[str]) -> None:
+        if authorization:
+            self.recent_writers[self.get_key(authorization)] = True
+
+    def wrote_recently(self, authorization: Optional[str]) -> bool:
+        return bool(authorization) and (
+            self.get_key(authorization) in self.recent_writers
+        )
+
+
+replica_lag_guard = ReplicaLagGuard(
+    settings.cache_maxsize, settings.replica_lag
+)
+
+
+class ReplicaLagMiddleware:
+    """
+    ASGI-middleware: отмечает автора запроса, изменяющего данные,
+    в replica_lag_guard, когда отправляется начало ответа, - до того,
+    как клиент получит ответ и сможет прочитать свои изменения.
+    """
+
+    READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope['type'] != 'http' or
+            scope['method'] in self.READ_METHODS
+        ):
+            await self.app(scope, receive, send)
+            return
+        authorization = Headers(scope=scope).get('Authorization')
+
+        async def send_after_mark(message):
+            if message['type'] == 'http.response.start':
+                replica_lag_guard.mark_write(authorization)
+            await send(message)
+
+        await self.app(scope, receive, send_after_mark)
+
+
+async def get_async_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    Асинхронный генератор сессий для эндпоинтов, которые только читают.
+    Если задан settings.replica_url, сессия открывается на реплике,
+    иначе, а также для клиента, недавно писавшего в БД,
+    используется сессия основной БД из get_async_session.
+    """
+    if AsyncReadSessionLocal is None or replica_lag_guard.wrote_recently(
+        request.headers.get('Authorization')
+    ):
+        yield session
+        return
+    async with AsyncReadSessionLocal() as read_session:
+        yield read_session
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """Проверяет, открыта ли сессия на реплике."""
+    return session.info.get(REPLICA_SESSION, False)
+
+
+# Очереди на запись в SQLite по циклам событий: SQLite допускает одного
+# писателя, и ожидание в asyncio.Lock обходится дешевле, чем опрос
+# заблокированной БД встроенным busy-обработчиком.
+_sqlite_write_locks = weakref.WeakKeyDictionary()
+
+
+async def lock_for_write(session: AsyncSession) -> None:
+    """
+    Захватывает блокировку БД на запись до начала чтения.
+    Нужна для SQLite, где нет блокировки отдельных строк:
+    транзакция распределения инвестиций сразу получает право записи
+    (BEGIN IMMEDIATE), а параллельные запросы процесса ждут ее
+    завершения в очереди, а не читают данные, которые вот-вот изменятся.
+    Блокировка снимается при фиксации или откате транзакции,
+    повторный вызов в той же транзакции ничего не делает.
+    На остальных СУБД строки блокируются самим запросом (FOR UPDATE).
+    Вызывается до первого изменения данных в транзакции.
+    """
+    if session.bind.dialect.name != 'sqlite' or 'write_lock' in session.info:
+        return
+    loop = asyncio.get_running_loop()
+    write_lock = _sqlite_write_locks.get(loop)
+    if write_lock is None:
+        write_lock = _sqlite_write_locks[loop] = asyncio.Lock()
+    await write_lock.acquire()
+    session.info['write_lock'] = write_lock
+    try:
+        await session.execute(text('BEGIN IMMEDIATE'))
+    except Exception:
+        await session.rollback()
+        if 'write_lock' in session.info:
+            session.info.pop('write_lock').release()
+        raise
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def release_write_lock(session, transaction):
+    """Снимает блокировку на запись при завершении транзакции."""
+    if transaction.parent is None and 'write_lock' in session.info:
+        session.info.pop('write_lock').release()
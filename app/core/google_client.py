@@ -1,9 +1,19 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
 from aiogoogle import Aiogoogle
 from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.resource import GoogleAPI
 
 from app.core.config import settings
 
 
+logger = logging.getLogger(__name__)
+
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
     'https://www.googleapis.com/auth/drive'
@@ -22,9 +32,119 @@ INFO = {
     'client_x509_cert_url': settings.client_x509_cert_url
 }
 
+DISCOVERY_APIS = (('sheets', 'v4'), ('drive', 'v3'))
+
 cred = ServiceAccountCreds(scopes=SCOPES, **INFO)
 
 
+class CachedAiogoogle(Aiogoogle):
+    """
+    Долгоживущий клиент Google API на весь процесс.
+    Discovery-документы загружаются один раз и хранятся в памяти
+    (и, если задан cache_dir, на диске), запросы идут через одну
+    сессию aiohttp, а токен сервисного аккаунта обновляется,
+    только когда истекает.
+    """
+
+    def __init__(self, *args, cache_dir: Optional[str] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.discovery_documents: Dict[Tuple[str, str], GoogleAPI] = {}
+        self.shared_session = None
+        self.shared_session_loop = None
+
+    def get_cache_path(self, api_name: str, api_version: str) -> Path:
+        return self.cache_dir / f'{api_name}_{api_version}.json'
+
+    async def discover(self, api_name, api_version=None, validate=False):
+        """Возвращает discovery-документ API из кэша, загружая его один раз."""
+        key = (api_name, api_version)
+        if key not in self.discovery_documents:
+            document = self.load_discovery_document(api_name, api_version)
+            if document is None:
+                api = await super().discover(api_name, api_version)
+                document = api.discovery_document
+                self.save_discovery_document(api_name, api_version, document)
+            self.discovery_documents[key] = GoogleAPI(document)
+        api = self.discovery_documents[key]
+        if validate:
+            return GoogleAPI(api.discovery_document, validate)
+        return api
+
+    def load_discovery_document(
+        self, api_name: str, api_version: str
+    ) -> Optional[dict]:
+        if self.cache_dir is None or api_version is None:
+            return None
+        path = self.get_cache_path(api_name, api_version)
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def save_discovery_document(
+        self, api_name: str, api_version: str, document: dict
+    ) -> None:
+        if self.cache_dir is None or api_version is None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.get_cache_path(api_name, api_version).write_text(
+            json.dumps(document), encoding='utf-8'
+        )
+
+    def use_shared_session(self) -> None:
+        """
+        Подключает общую сессию aiohttp к текущему контексту.
+        Сессия создается при первом обращении в цикле событий
+        и переиспользуется всеми запросами этого цикла.
+        """
+        loop = asyncio.get_running_loop()
+        if (
+            self.shared_session is None or
+            self.shared_session.closed or
+            self.shared_session_loop is not loop
+        ):
+            self.shared_session = self.session_factory()
+            self.shared_session_loop = loop
+        self.session_context.set(self.shared_session)
+
+    async def start(self) -> None:
+        """
+        Загружает discovery-документы используемых API при запуске,
+        если настроен сервисный аккаунт.
+        """
+        if settings.client_email is None:
+            return
+        self.use_shared_session()
+        for api_name, api_version in DISCOVERY_APIS:
+            try:
+                await self.discover(api_name, api_version)
+            except Exception:
+                logger.warning(
+                    'Не удалось загрузить discovery-документ %s %s',
+                    api_name, api_version, exc_info=True,
+                )
+
+    async def stop(self) -> None:
+        """Закрывает общую сессию aiohttp."""
+        if self.shared_session is not None:
+            await self.shared_session.close()
+            self.shared_session = None
+            self.shared_session_loop = None
+
+
+google_client = CachedAiogoogle(
+    service_account_creds=cred,
+    cache_dir=settings.google_discovery_cache_dir,
+)
+
+
+@asynccontextmanager
+async def open_service():
+    """Возвращает долгоживущий клиент Google API с общей сессией."""
+    google_client.use_shared_session()
+    yield google_client
+
+
 async def get_service():
-    async with Aiogoogle(service_account_creds=cred) as aiogoogle:
+    async with open_service() as aiogoogle:
         yield aiogoogle
@@ -0,0 +1,229 @@
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+
+QUERY_START_TIMES = 'query_start_times'
+UNMATCHED_ROUTE = '<unmatched>'
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000, 10000)
+
+
+class RequestStats:
+    """Время и объем работы с БД в рамках одного запроса."""
+
+    __slots__ = ('db_time', 'statement_count', 'rows_fetched')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.statement_count = 0
+        self.rows_fetched = 0
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    'current_request_stats', default=None
+)
+
+
+def count_rows(cursor) -> int:
+    """
+    Число строк, выбранных или измененных запросом.
+    Асинхронные адаптеры SQLAlchemy выбирают результат целиком
+    при execute и держат его в _rows; строки, читаемые серверным
+    курсором, не учитываются.
+    """
+    rows = getattr(cursor, '_rows', None)
+    if rows:
+        return len(rows)
+    return max(cursor.rowcount, 0)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context,
+                      executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault(QUERY_START_TIMES, []).append(
+            time.perf_counter()
+        )
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def record_query(conn, cursor, statement, parameters, context,
+                 executemany):
+    stats = current_request_stats.get()
+    start_times = conn.info.get(QUERY_START_TIMES)
+    if stats is None or not start_times:
+        return
+    stats.db_time += time.perf_counter() - start_times.pop()
+    stats.statement_count += 1
+    stats.rows_fetched += count_rows(cursor)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с разбивкой по меткам."""
+
+    def __init__(self, name: str, description: str, buckets: Sequence):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts: Dict[Tuple, List[int]] = defaultdict(
+            lambda: [0] * (len(self.buckets) + 1)
+        )
+        self.sums: Dict[Tuple, float] = defaultdict(float)
+
+    def observe(self, labels: Tuple[Tuple[str, str], ...], value) -> None:
+        self.counts[labels][bisect_left(self.buckets, value)] += 1
+        self.sums[labels] += value
+
+    def render(self) -> List[str]:
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for labels, counts in sorted(self.counts.items()):
+            label_text = ','.join(
+                f'{key}="{escape_label(value)}"' for key, value in labels
+            )
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                total += count
+                lines.append(
+                    f'{self.name}_bucket{{{label_text},le="{bound}"}} {total}'
+                )
+            lines.append(f'{self.name}_sum{{{label_text}}} '
+                         f'{self.sums[labels]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {total}')
+        return lines
+
+
+def escape_label(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class RequestMetrics:
+    """Гистограммы времени запросов и работы с БД по маршрутам."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.duration = Histogram(
+            'http_request_duration_seconds',
+            'Время обработки запроса.',
+            DURATION_BUCKETS,
+        )
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds',
+            'Время выполнения SQL-запросов за время запроса.',
+            DURATION_BUCKETS,
+        )
+        self.statements = Histogram(
+            'http_request_sql_statements',
+            'Число SQL-запросов за время запроса.',
+            COUNT_BUCKETS,
+        )
+        self.rows = Histogram(
+            'http_request_db_rows',
+            'Число строк, выбранных или измененных за время запроса.',
+            COUNT_BUCKETS,
+        )
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status: int,
+        duration: float,
+        stats: RequestStats,
+    ) -> None:
+        labels = (
+            ('method', method), ('route', route), ('status', str(status))
+        )
+        self.duration.observe(labels, duration)
+        self.db_duration.observe(labels, stats.db_time)
+        self.statements.observe(labels, stats.statement_count)
+        self.rows.observe(labels, stats.rows_fetched)
+
+    def render(self) -> str:
+        lines = []
+        for histogram in (
+            self.duration, self.db_duration, self.statements, self.rows
+        ):
+            lines.extend(histogram.render())
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+def get_server_timing(duration: float, stats: RequestStats) -> str:
+    """Значение заголовка Server-Timing в миллисекундах."""
+    return (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={stats.db_time * 1000:.1f};'
+        f'desc="{stats.statement_count} queries, '
+        f'{stats.rows_fetched} rows"'
+    )
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI-middleware: при settings.metrics_enabled замеряет время
+    запроса, время и число SQL-запросов и выбранные строки,
+    отдает их в заголовке Server-Timing и копит в request_metrics.
+    Заголовок отправляется вместе с началом ответа, поэтому
+    для потоковых ответов в нем нет работы, сделанной после этого;
+    гистограммы учитывают запрос целиком.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.route_paths = None
+
+    def get_route(self, scope) -> str:
+        if self.route_paths is None:
+            self.route_paths = {
+                route.endpoint: route.path
+                for route in scope['app'].routes
+                if hasattr(route, 'endpoint')
+            }
+        return self.route_paths.get(scope.get('endpoint'), UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                message['headers'] = list(message.get('headers', [])) + [(
+                    b'server-timing',
+                    get_server_timing(
+                        time.perf_counter() - start, stats
+                    ).encode(),
+                )]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            request_metrics.observe(
+                scope['method'], self.get_route(scope), status,
+                time.perf_counter() - start, stats,
+            )
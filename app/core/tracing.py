@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+
+SPAN_KIND_INTERNAL = 1
+STATUS_CODE_ERROR = 2
+FLUSH_SIZE = 100
+
+
+class NoopSpan:
+    """Интервал, который ничего не записывает."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add(self, key: str, amount: int = 1) -> None:
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer:
+    """
+    Интерфейс трассировщика.
+    Базовая реализация ничего не записывает и не тратит время
+    на горячем пути; реализации переопределяют span и close.
+    """
+
+    def span(self, name: str, **attributes) -> NoopSpan:
+        """Контекстный менеджер интервала с атрибутами."""
+        return NOOP_SPAN
+
+    def close(self) -> None:
+        """Дописывает накопленные интервалы."""
+
+
+current_span: ContextVar[Optional['RecordingSpan']] = ContextVar(
+    'current_span', default=None
+)
+
+
+class RecordingSpan(NoopSpan):
+    """
+    Интервал с временем начала и конца, атрибутами и счетчиками.
+    Вложенные интервалы получают trace_id и родителя
+    из текущего интервала контекста.
+    """
+
+    def __init__(self, tracer: 'OtlpFileTracer', name: str, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.span_id = os.urandom(8).hex()
+        self.parent = None
+        self.trace_id = None
+        self.start_time = None
+        self.end_time = None
+        self.error = None
+        self.token = None
+
+    def __enter__(self):
+        self.parent = current_span.get()
+        self.trace_id = (
+            self.parent.trace_id if self.parent is not None
+            else os.urandom(16).hex()
+        )
+        self.token = current_span.set(self)
+        self.start_time = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.end_time = time.time_ns()
+        current_span.reset(self.token)
+        if exc is not None:
+            self.error = repr(exc)
+        self.tracer.export(self)
+        return None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: int = 1) -> None:
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+
+def encode_attribute(key: str, value: Any) -> Dict:
+    """Атрибут в JSON-кодировке OTLP."""
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+class OtlpFileTracer(Tracer):
+    """
+    Трассировщик, который пишет интервалы в файл в формате
+    OTLP/JSON: по строке ExportTraceServiceRequest на каждые
+    FLUSH_SIZE интервалов. Такой файл читает приемник otlpjsonfile
+    OpenTelemetry Collector, дальше интервалы можно отправить
+    в любой совместимый бэкенд.
+    """
+
+    def __init__(self, path: str, service_name: str = settings.app_title):
+        self.path = path
+        self.service_name = service_name
+        self.spans: List[Dict] = []
+        self.lock = threading.Lock()
+
+    def span(self, name: str, **attributes) -> RecordingSpan:
+        return RecordingSpan(self, name, attributes)
+
+    def export(self, span: RecordingSpan) -> None:
+        encoded = {
+            'traceId': span.trace_id,
+            'spanId': span.span_id,
+            'parentSpanId': (
+                span.parent.span_id if span.parent is not None else ''
+            ),
+            'name': span.name,
+            'kind': SPAN_KIND_INTERNAL,
+            'startTimeUnixNano': str(span.start_time),
+            'endTimeUnixNano': str(span.end_time),
+            'attributes': [
+                encode_attribute(key, value)
+                for key, value in span.attributes.items()
+            ],
+        }
+        if span.error is not None:
+            encoded['status'] = {
+                'code': STATUS_CODE_ERROR, 'message': span.error
+            }
+        with self.lock:
+            self.spans.append(encoded)
+            if len(self.spans) >= FLUSH_SIZE:
+                self.flush()
+
+    def flush(self) -> None:
+        if not self.spans:
+            return
+        request = {'resourceSpans': [{
+            'resource': {'attributes': [
+                encode_attribute('service.name', self.service_name)
+            ]},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': self.spans,
+            }],
+        }]}
+        with open(self.path, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(request, ensure_ascii=False) + '\n')
+        self.spans = []
+
+    def close(self) -> None:
+        with self.lock:
+            self.flush()
+
+
+tracer: Tracer = (
+    OtlpFileTracer(settings.trace_file) if settings.trace_file else Tracer()
+)
+
+
+def get_tracer() -> Tracer:
+    return tracer
+
+
+def set_tracer(new_tracer: Tracer) -> Tracer:
+    """Подменяет трассировщик процесса и возвращает прежний."""
+    global tracer
+    previous, tracer = tracer, new_tracer
+    return previous
+
+
+def start_span(name: str, **attributes):
+    """Интервал текущего трассировщика."""
+    return tracer.span(name, **attributes)
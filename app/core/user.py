@@ -1,12 +1,18 @@
-from typing import Optional, Union
+import time
+from http import HTTPStatus
+from typing import Any, Dict, NamedTuple, Optional, Union
 
-from fastapi import Depends, Request
+import jwt
+from cachetools import TTLCache
+from fastapi import Depends, HTTPException, Request
 from fastapi_users import (
-    BaseUserManager, FastAPIUsers, IntegerIDMixin, InvalidPasswordException
+    BaseUserManager, FastAPIUsers, IntegerIDMixin, InvalidPasswordException,
+    exceptions
 )
 from fastapi_users.authentication import (
     AuthenticationBackend, BearerTransport, JWTStrategy
 )
+from fastapi_users.jwt import decode_jwt
 from fastapi_users_db_sqlalchemy import SQLAlchemyUserDatabase
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -23,8 +29,97 @@ async def get_user_db(session: AsyncSession = Depends(get_async_session)):
 bearer_transport = BearerTransport(tokenUrl='auth/jwt/login')
 
 
-def get_jwt_strategy() -> JWTStrategy:
-    return JWTStrategy(secret=settings.secret_key, lifetime_seconds=3600)
+class AuthenticatedUser(NamedTuple):
+    """Данные пользователя, которых эндпоинтам достаточно для проверки прав."""
+    id: int
+    is_active: bool
+    is_superuser: bool
+
+
+class VerifiedTokenCache:
+    """
+    Проверенные JWT и снимки их пользователей.
+    Запись живет не дольше settings.auth_cache_ttl и срока действия
+    токена, при изменении пользователя через UserManager его записи
+    удаляются. Кэш свой у каждого процесса: в других воркерах
+    изменение пользователя вступит в силу через auth_cache_ttl.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, token: str) -> Optional[AuthenticatedUser]:
+        entry = self.tokens.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            self.tokens.pop(token, None)
+            return None
+        return user
+
+    def set(
+        self,
+        token: str,
+        user: AuthenticatedUser,
+        expires_at: Optional[float],
+    ) -> None:
+        self.tokens[token] = (user, expires_at)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Удаляет все токены пользователя."""
+        for token, (user, _) in list(self.tokens.items()):
+            if user.id == user_id:
+                self.tokens.pop(token, None)
+
+
+verified_tokens = VerifiedTokenCache(
+    maxsize=settings.auth_cache_maxsize, ttl=settings.auth_cache_ttl
+)
+
+
+class CachedJWTStrategy(JWTStrategy):
+    """JWTStrategy, которая запоминает проверенные токены."""
+
+    async def read_user(
+        self,
+        token: str,
+        user_manager: BaseUserManager,
+    ) -> Optional[AuthenticatedUser]:
+        """
+        Как read_token, но возвращает снимок пользователя.
+        Пользователь читается из БД только при первом запросе с токеном,
+        дальше снимок берется из verified_tokens.
+        """
+        user = verified_tokens.get(token)
+        if user is not None:
+            return user
+        try:
+            data: Dict[str, Any] = decode_jwt(
+                token, self.decode_key, self.token_audience,
+                algorithms=[self.algorithm],
+            )
+            db_user = await user_manager.get(
+                user_manager.parse_id(data['user_id'])
+            )
+        except (
+            jwt.PyJWTError, KeyError,
+            exceptions.UserNotExists, exceptions.InvalidID,
+        ):
+            return None
+        user = AuthenticatedUser(
+            id=db_user.id,
+            is_active=db_user.is_active,
+            is_superuser=db_user.is_superuser,
+        )
+        verified_tokens.set(token, user, data.get('exp'))
+        return user
+
+
+def get_jwt_strategy() -> CachedJWTStrategy:
+    return CachedJWTStrategy(
+        secret=settings.secret_key, lifetime_seconds=3600
+    )
 
 
 auth_backend = AuthenticationBackend(
@@ -55,6 +150,19 @@ class UserManager(IntegerIDMixin, BaseUserManager[User, int]):
     ):
         print(f'Пользователь {user.email} зарегистрирован.')
 
+    async def on_after_update(
+            self,
+            user: User,
+            update_dict: Dict[str, Any],
+            request: Optional[Request] = None,
+    ):
+        verified_tokens.invalidate_user(user.id)
+
+    async def on_after_reset_password(
+            self, user: User, request: Optional[Request] = None
+    ):
+        verified_tokens.invalidate_user(user.id)
+
 
 async def get_user_manager(user_db=Depends(get_user_db)):
     yield UserManager(user_db)
@@ -65,5 +173,30 @@ fastapi_users = FastAPIUsers[User, int](
     [auth_backend],
 )
 
-current_user = fastapi_users.current_user(active=True)
-current_superuser = fastapi_users.current_user(active=True, superuser=True)
+
+def get_current_user(superuser: bool = False):
+    """
+    Зависимость для активного пользователя (или суперпользователя)
+    по проверенному JWT. В отличие от fastapi_users.current_user
+    возвращает AuthenticatedUser и не читает пользователя из БД,
+    если токен уже проверялся.
+    """
+    async def current_user_dependency(
+        token: Optional[str] = Depends(bearer_transport.scheme),
+        user_manager: UserManager = Depends(get_user_manager),
+        strategy: CachedJWTStrategy = Depends(get_jwt_strategy),
+    ) -> AuthenticatedUser:
+        user = None
+        if token is not None:
+            user = await strategy.read_user(token, user_manager)
+        if user is None or not user.is_active:
+            raise HTTPException(status_code=HTTPStatus.UNAUTHORIZED)
+        if superuser and not user.is_superuser:
+            raise HTTPException(status_code=HTTPStatus.FORBIDDEN)
+        return user
+
+    return current_user_dependency
+
+
+current_user = get_current_user()
+current_superuser = get_current_user(superuser=True)
@@ -1,17 +1,47 @@
-from typing import Optional, Union, List
+from datetime import datetime
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Optional, List, Sequence, Tuple
 
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import false, func, insert, inspect, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import User, Donation, CharityProject
+from app.core.tracing import start_span
+from app.models import FundStats, User
+from app.models.fund_stats import FUND_STATS_ID
+
+
+class AllocationConflict(Exception):
+    """
+    Открытый объект был изменен параллельным запросом
+    между его чтением и записью инвестиций.
+    """
+
+
+def get_committed_state(db_obj) -> SimpleNamespace:
+    """
+    Возвращает значения колонок объекта в том виде,
+    в каком они были загружены из БД, без несохраненных изменений.
+    """
+    state = inspect(db_obj)
+    values = {}
+    for column in state.mapper.column_attrs:
+        history = state.attrs[column.key].history
+        loaded = history.deleted or history.unchanged or [None]
+        values[column.key] = loaded[0]
+    return SimpleNamespace(**values)
 
 
 class CRUDBase:
     """Базовые CRUD операции для работы с БД."""
 
+    open_objects_page_size = 100
+    stream_batch_size = 1000
+
     def __init__(self, model):
         self.model = model
+        self.column_names = frozenset(
+            column.key for column in inspect(model).column_attrs
+        )
 
     async def get(
             self,
@@ -28,23 +58,254 @@ class CRUDBase:
 
     async def get_multi(
             self,
-            session: AsyncSession
+            session: AsyncSession,
+            limit: Optional[int] = None,
+            after: Optional[int] = None,
     ):
-        """Возвращает список всех объектов модели."""
-        db_objs = await session.execute(select(self.model))
+        """
+        Возвращает список объектов модели в порядке возрастания id.
+        Для постраничной выдачи принимает размер страницы limit
+        и курсор after - id последнего объекта предыдущей страницы.
+        """
+        query = select(self.model).order_by(self.model.id)
+        if after is not None:
+            query = query.where(self.model.id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        db_objs = await session.execute(query)
         return db_objs.scalars().all()
 
-    async def get_open_objects(
+    async def stream_rows(
             self,
             session: AsyncSession,
-    ) -> Union[List[Donation], List[CharityProject]]:
-        """Возвращает список открытых пожертвований / проектов."""
-        open_objects = await session.execute(
+            columns: Sequence[str],
+            date_from: Optional[datetime] = None,
+            date_to: Optional[datetime] = None,
+            fully_invested: Optional[bool] = None,
+    ) -> AsyncIterator[Tuple]:
+        """
+        Построчно отдает значения указанных колонок объектов модели
+        в порядке возрастания id, не загружая всю выборку в память:
+        строки читаются серверным курсором порциями по
+        stream_batch_size.
+        Фильтрует по дате создания и статусу.
+        """
+        query = select(
+            *(getattr(self.model, column) for column in columns)
+        ).order_by(self.model.id)
+        if date_from is not None:
+            query = query.where(self.model.create_date >= date_from)
+        if date_to is not None:
+            query = query.where(self.model.create_date < date_to)
+        if fully_invested is not None:
+            query = query.where(self.model.fully_invested == fully_invested)
+        rows = await session.stream(
+            query.execution_options(yield_per=self.stream_batch_size)
+        )
+        async for row in rows:
+            yield row
+
+    def get_column_types(self, columns: Sequence[str]) -> List[type]:
+        """Питоновские типы значений указанных колонок модели."""
+        return [
+            self.model.__table__.columns[column].type.python_type
+            for column in columns
+        ]
+
+    async def get_oldest_open_object(
+            self,
+            session: AsyncSession,
+    ):
+        """Возвращает самое старое открытое пожертвование / проект."""
+        db_obj = await session.execute(
             select(self.model).where(
-                self.model.fully_invested == 0
-            )
+                self.model.fully_invested == false()
+            ).order_by(
+                self.model.create_date, self.model.id
+            ).limit(1)
+        )
+        return db_obj.scalars().first()
+
+    async def iterate_open_objects(
+            self,
+            amount: int,
+            session: AsyncSession,
+    ) -> AsyncIterator[Tuple[int, int, int]]:
+        """
+        Постранично отдает id, нераспределенные суммы и версии открытых
+        пожертвований / проектов в порядке создания,
+        пока не наберется сумма amount.
+        Страницы выбираются по ключу (create_date, id), а нарастающий итог
+        внутри страницы считается в БД, поэтому из базы читаются
+        только строки, до которых дойдет распределение.
+        Там, где это поддерживается (PostgreSQL), строки страницы
+        блокируются до конца транзакции (FOR UPDATE): параллельный
+        запрос дождется фиксации и прочитает уже обновленные суммы.
+        """
+        uninvested = (
+            self.model.full_amount -
+            func.coalesce(self.model.invested_amount, 0)
+        )
+        last_key = None
+        while amount > 0:
+            page = select(
+                self.model.id,
+                self.model.create_date,
+                self.model.version,
+                uninvested.label('uninvested'),
+            ).where(
+                self.model.fully_invested == false()
+            ).order_by(
+                self.model.create_date, self.model.id
+            ).limit(
+                self.open_objects_page_size
+            ).with_for_update()
+            if last_key is not None:
+                page = page.where(
+                    tuple_(self.model.create_date, self.model.id) > last_key
+                )
+            page = page.subquery()
+            order = (page.c.create_date, page.c.id)
+            candidates = select(
+                page.c.id,
+                page.c.create_date,
+                page.c.version,
+                page.c.uninvested,
+                func.sum(page.c.uninvested).over(
+                    order_by=order
+                ).label('running_total'),
+            ).subquery()
+            with start_span(
+                'fetch', model=self.model.__tablename__
+            ) as span:
+                rows = await session.execute(
+                    select(
+                        candidates.c.id,
+                        candidates.c.create_date,
+                        candidates.c.version,
+                        candidates.c.uninvested,
+                    ).where(
+                        candidates.c.running_total -
+                        candidates.c.uninvested < amount
+                    ).order_by(candidates.c.create_date, candidates.c.id)
+                )
+                rows = rows.all()
+                span.set_attribute('rows_examined', len(rows))
+            for obj_id, _, obj_version, obj_uninvested in rows:
+                yield obj_id, obj_uninvested, obj_version
+                amount -= obj_uninvested
+            if not rows:
+                return
+            last_key = (rows[-1].create_date, rows[-1].id)
+
+    async def close_objects(
+            self,
+            obj_versions: List[Tuple[int, int]],
+            session: AsyncSession,
+    ) -> None:
+        """
+        Одним запросом закрывает пожертвования / проекты,
+        полностью покрытые инвестициями.
+        Принимает пары (id, версия) и обновляет строку только если
+        версия не изменилась с момента чтения, иначе поднимает
+        AllocationConflict.
+        """
+        if not obj_versions:
+            return
+        result = await session.execute(
+            update(self.model).where(
+                tuple_(self.model.id, self.model.version).in_(obj_versions)
+            ).values(
+                invested_amount=self.model.full_amount,
+                fully_invested=True,
+                close_date=datetime.utcnow(),
+                version=self.model.version + 1,
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != len(obj_versions):
+            raise AllocationConflict
+
+    async def add_investment(
+            self,
+            obj_id: int,
+            obj_version: int,
+            amount: int,
+            session: AsyncSession,
+    ) -> None:
+        """
+        Увеличивает сумму инвестиций открытого объекта на amount,
+        если версия объекта не изменилась с момента чтения,
+        иначе поднимает AllocationConflict.
+        """
+        result = await session.execute(
+            update(self.model).where(
+                self.model.id == obj_id,
+                self.model.version == obj_version,
+            ).values(
+                invested_amount=(
+                    func.coalesce(self.model.invested_amount, 0) + amount
+                ),
+                version=self.model.version + 1,
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            raise AllocationConflict
+
+    def get_stats(self, db_obj) -> Dict[str, int]:
+        """
+        Вклад объекта в агрегированную статистику фонда.
+        Переопределяется для моделей, которые учитываются в статистике.
+        """
+        return {}
+
+    def get_allocation_stats(
+            self,
+            invested: int,
+            closed: int,
+    ) -> Dict[str, int]:
+        """
+        Изменение статистики фонда при распределении в открытые объекты
+        суммы invested, из-за которого закрылись closed объектов.
+        """
+        return {}
+
+    async def update_stats(
+            self,
+            stats: Dict[str, int],
+            session: AsyncSession,
+            sign: int = 1,
+    ) -> None:
+        """Прибавляет (sign=-1 - вычитает) значения к статистике фонда."""
+        stats = {field: value for field, value in stats.items() if value}
+        if not stats:
+            return
+        await session.execute(
+            update(FundStats).where(
+                FundStats.id == FUND_STATS_ID
+            ).values({
+                field: getattr(FundStats, field) + sign * value
+                for field, value in stats.items()
+            })
+        )
+
+    async def update_object_stats(
+            self,
+            db_obj,
+            stats_before: Dict[str, int],
+            session: AsyncSession,
+    ) -> None:
+        """
+        Учитывает в статистике фонда изменения объекта
+        относительно его вклада stats_before.
+        """
+        stats_after = self.get_stats(db_obj)
+        await self.update_stats(
+            {
+                field: stats_after[field] - stats_before[field]
+                for field in stats_after
+            },
+            session,
         )
-        return open_objects.scalars().all()
 
     async def create_db_object(
             self,
@@ -65,37 +326,109 @@ class CRUDBase:
     async def commit_creation(
             self,
             db_obj,
-            objects_to_be_comitted,
             session: AsyncSession,
     ):
         """
-        Записывает в базу новый объект, а также проекты / пожертвования,
-        суммы по которым / статусы были изменены при распределении инвестиций,
-        вызванных созданием нового объекта.
+        Записывает в базу новый объект и фиксирует транзакцию
+        вместе с изменениями проектов / пожертвований,
+        внесенными при распределении инвестиций.
+        В той же транзакции объект учитывается в статистике фонда.
+        id и значения по умолчанию заполняются при вставке строки,
+        поэтому после фиксации объект не перечитывается.
         """
-        session.add(db_obj)
-        for obj in objects_to_be_comitted:
-            session.add(obj)
-        await session.commit()
-        await session.refresh(db_obj)
+        with start_span('commit', model=self.model.__tablename__) as span:
+            await self.update_stats(self.get_stats(db_obj), session)
+            session.add(db_obj)
+            await session.commit()
+            span.set_attribute('rows_modified', 1)
         return db_obj
 
+    async def bulk_insert(
+            self,
+            db_objs: List,
+            session: AsyncSession,
+    ) -> None:
+        """
+        Записывает новые объекты одним INSERT с несколькими строками
+        VALUES и проставляет им id.
+        На PostgreSQL id возвращаются через RETURNING, на SQLite
+        вычисляются по последнему rowid: SQLite выполняет запрос
+        под блокировкой на запись, и его строки получают идущие подряд
+        rowid.
+        На остальных СУБД объекты добавляются в сессию по одному.
+        """
+        dialect_name = session.bind.dialect.name
+        if dialect_name not in ('postgresql', 'sqlite'):
+            session.add_all(db_objs)
+            await session.flush()
+            return
+        now = datetime.utcnow()
+        rows = []
+        for db_obj in db_objs:
+            db_obj.create_date = db_obj.create_date or now
+            db_obj.invested_amount = db_obj.invested_amount or 0
+            db_obj.fully_invested = bool(db_obj.fully_invested)
+            db_obj.version = 1
+            rows.append({
+                column: getattr(db_obj, column)
+                for column in self.column_names - {'id'}
+            })
+        statement = insert(self.model).values(rows)
+        if dialect_name == 'postgresql':
+            result = await session.execute(
+                statement.returning(self.model.id)
+            )
+            obj_ids = result.scalars().all()
+        else:
+            result = await session.execute(statement)
+            obj_ids = range(
+                result.lastrowid - len(rows) + 1, result.lastrowid + 1
+            )
+        for db_obj, obj_id in zip(db_objs, obj_ids):
+            db_obj.id = obj_id
+
+    async def commit_bulk_creation(
+            self,
+            db_objs: List,
+            session: AsyncSession,
+    ) -> List:
+        """
+        Записывает в базу пачку новых объектов одним запросом
+        и фиксирует транзакцию вместе с изменениями
+        проектов / пожертвований, внесенными при распределении
+        инвестиций, и статистикой фонда.
+        """
+        stats = {}
+        for db_obj in db_objs:
+            for field, value in self.get_stats(db_obj).items():
+                stats[field] = stats.get(field, 0) + value
+        with start_span('commit', model=self.model.__tablename__) as span:
+            await self.update_stats(stats, session)
+            await self.bulk_insert(db_objs, session)
+            await session.commit()
+            span.set_attribute('rows_modified', len(db_objs))
+        return db_objs
+
     async def update(
             self,
             db_obj,
             obj_in,
             session: AsyncSession,
     ):
-        """Вносит изменения в объект базы данных."""
-        obj_data = jsonable_encoder(db_obj)
+        """
+        Вносит изменения в объект базы данных
+        и обновляет статистику фонда в той же транзакции.
+        Нарушение ограничений БД (например, уникальности)
+        поднимает IntegrityError.
+        """
+        stats_before = self.get_stats(get_committed_state(db_obj))
         update_data = obj_in.dict(exclude_unset=True)
 
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
+        for field in self.column_names & update_data.keys():
+            setattr(db_obj, field, update_data[field])
+        await self.update_object_stats(db_obj, stats_before, session)
         session.add(db_obj)
         await session.commit()
-        await session.refresh(db_obj)
         return db_obj
 
     async def remove(
@@ -103,7 +436,17 @@ class CRUDBase:
             db_obj,
             session: AsyncSession,
     ):
-        """Удаляет объект из базы данных."""
+        """
+        Удаляет объект из базы данных
+        и исключает его из статистики фонда в той же транзакции.
+        Строка объекта удаляется раньше, чем изменяется статистика:
+        как и при распределении инвестиций, строка объекта
+        блокируется до строки статистики, и параллельные транзакции
+        не ждут друг друга по кругу.
+        """
+        stats = self.get_stats(get_committed_state(db_obj))
         await session.delete(db_obj)
+        await session.flush()
+        await self.update_stats(stats, session, sign=-1)
         await session.commit()
         return db_obj
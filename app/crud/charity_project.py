@@ -1,12 +1,42 @@
-from typing import Optional, List, Dict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+from sqlalchemy import Float, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 
 from app.crud.base import CRUDBase
 from app.models.charity_project import CharityProject
 
 
+REPORT_COLUMNS = ('name', 'period', 'description')
+
+
+class duration_seconds(FunctionElement):
+    """Длительность между двумя датами в секундах, вычисляемая в БД."""
+    type = Float()
+    name = 'duration_seconds'
+    inherit_cache = True
+
+
+@compiles(duration_seconds)
+def compile_duration_seconds(element, compiler, **kw):
+    start, end = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f'EXTRACT(EPOCH FROM ({end} - {start}))'
+
+
+@compiles(duration_seconds, 'sqlite')
+def compile_duration_seconds_sqlite(element, compiler, **kw):
+    start, end = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f'((julianday({end}) - julianday({start})) * 86400.0)'
+
+
+@compiles(duration_seconds, 'mysql')
+def compile_duration_seconds_mysql(element, compiler, **kw):
+    start, end = (compiler.process(arg, **kw) for arg in element.clauses)
+    return f'TIMESTAMPDIFF(MICROSECOND, {start}, {end}) / 1000000.0'
+
+
 class CRUDCharityProject(CRUDBase):
     """Дополнительные CRUD методы для работы с проектами."""
 
@@ -24,29 +54,120 @@ class CRUDCharityProject(CRUDBase):
         db_project_id = db_project_id.scalars().first()
         return db_project_id
 
+    async def get_existing_names(
+            self,
+            project_names: List[str],
+            session: AsyncSession,
+    ) -> List[str]:
+        """Возвращает те из названий, которые уже заняты проектами."""
+        existing_names = await session.execute(
+            select(CharityProject.name).where(
+                CharityProject.name.in_(project_names)
+            )
+        )
+        return existing_names.scalars().all()
+
+    def get_stats(self, db_obj) -> Dict[str, int]:
+        """Вклад проекта в статистику фонда."""
+        return {
+            'project_count': 1,
+            'open_project_count': 0 if db_obj.fully_invested else 1,
+            'requested_amount': db_obj.full_amount,
+        }
+
+    def get_allocation_stats(
+        self,
+        invested: int,
+        closed: int,
+    ) -> Dict[str, int]:
+        """Закрытые при распределении проекты перестают быть открытыми."""
+        return {'open_project_count': -closed}
+
+    def get_completion_rate_query(self, limit: Optional[int] = None):
+        """
+        Запрос закрытых проектов, отсортированных по возрастанию
+        периода от открытия до закрытия.
+        Длительность сбора и сортировка по ней вычисляются в БД,
+        limit ограничивает отчет самыми быстрыми проектами.
+        """
+        duration = duration_seconds(
+            CharityProject.create_date, CharityProject.close_date
+        )
+        query = select(
+            CharityProject.name,
+            CharityProject.description,
+            CharityProject.create_date,
+            CharityProject.close_date,
+        ).where(
+            CharityProject.fully_invested == 1
+        ).order_by(duration, CharityProject.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    @staticmethod
+    def get_report_row(project) -> Dict[str, str]:
+        return {'name': project.name,
+                'period': str(project.close_date - project.create_date),
+                'description': project.description}
+
     async def get_projects_by_completion_rate(
         self,
         session: AsyncSession,
+        limit: Optional[int] = None,
     ) -> List[Dict[str, str]]:
         """
         Возвращает список данных о закрытых проектах,
         отсортированный по возрастанию периода
         от открытия до закрытия.
         """
-        closed_objects = await session.execute(
-            select(CharityProject).where(
+        closed_projects = await session.execute(
+            self.get_completion_rate_query(limit)
+        )
+        return [self.get_report_row(project) for project in closed_projects]
+
+    async def iter_projects_by_completion_rate(
+        self,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+        chunk_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, str]]]:
+        """
+        То же, что get_projects_by_completion_rate, но читает строки
+        курсором и отдает их частями по chunk_size,
+        не загружая весь отчет в память.
+        """
+        closed_projects = await session.stream(
+            self.get_completion_rate_query(limit)
+        )
+        async for partition in closed_projects.partitions(chunk_size):
+            yield [self.get_report_row(project) for project in partition]
+
+    async def stream_report_rows(
+        self,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[str, str, str]]:
+        """Построчно отдает отчет о закрытых проектах в колонках REPORT_COLUMNS."""
+        async for chunk in self.iter_projects_by_completion_rate(
+            session, limit, chunk_size=self.stream_batch_size
+        ):
+            for project in chunk:
+                yield tuple(project[column] for column in REPORT_COLUMNS)
+
+    async def count_closed_projects(
+        self,
+        session: AsyncSession,
+        limit: Optional[int] = None,
+    ) -> int:
+        """Возвращает число закрытых проектов, но не больше limit."""
+        count = await session.execute(
+            select(func.count()).select_from(CharityProject).where(
                 CharityProject.fully_invested == 1
             )
         )
-        return sorted(
-            [
-                {'name': obj.name,
-                 'period': str(obj.close_date - obj.create_date),
-                 'description': obj.description}
-                for obj in closed_objects.scalars().all()
-            ],
-            key=lambda obj: obj['period']
-        )
+        count = count.scalar()
+        return count if limit is None else min(count, limit)
 
 
 charity_project_crud = CRUDCharityProject(CharityProject)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -19,9 +19,25 @@ class CRUDDonation(CRUDBase):
         donations = await session.execute(
             select(Donation).where(
                 Donation.user_id == user.id
-            )
+            ).order_by(Donation.create_date)
         )
         return donations.scalars().all()
 
+    def get_stats(self, db_obj) -> Dict[str, int]:
+        """Вклад пожертвования в статистику фонда."""
+        return {
+            'donation_count': 1,
+            'donated_amount': db_obj.full_amount,
+            'invested_amount': db_obj.invested_amount or 0,
+        }
+
+    def get_allocation_stats(
+        self,
+        invested: int,
+        closed: int,
+    ) -> Dict[str, int]:
+        """Распределенные деньги пожертвований считаются вложенными."""
+        return {'invested_amount': invested}
+
 
 donation_crud = CRUDDonation(Donation)
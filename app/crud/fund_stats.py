@@ -0,0 +1,104 @@
+from typing import Dict
+
+from sqlalchemy import false, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import lock_for_write
+from app.crud.base import CRUDBase
+from app.models import CharityProject, Donation, FundStats
+from app.models.fund_stats import FUND_STATS_ID
+
+STATS_FIELDS = (
+    'project_count',
+    'open_project_count',
+    'requested_amount',
+    'donation_count',
+    'donated_amount',
+    'invested_amount',
+)
+
+
+class CRUDFundStats(CRUDBase):
+    """Чтение и пересчет агрегированной статистики фонда."""
+
+    async def get_current(
+        self,
+        session: AsyncSession,
+    ) -> FundStats:
+        """Возвращает строку статистики фонда одним запросом по ключу."""
+        return await self.get(FUND_STATS_ID, session)
+
+    async def calculate(
+        self,
+        session: AsyncSession,
+    ) -> Dict[str, int]:
+        """Заново считает статистику фонда по проектам и пожертвованиям."""
+        projects = await session.execute(
+            select(
+                func.count(CharityProject.id),
+                func.count(CharityProject.id).filter(
+                    func.coalesce(
+                        CharityProject.fully_invested, false()
+                    ) == false()
+                ),
+                func.coalesce(func.sum(CharityProject.full_amount), 0),
+            )
+        )
+        donations = await session.execute(
+            select(
+                func.count(Donation.id),
+                func.coalesce(func.sum(Donation.full_amount), 0),
+                func.coalesce(func.sum(Donation.invested_amount), 0),
+            )
+        )
+        return dict(zip(
+            STATS_FIELDS, (*projects.one(), *donations.one())
+        ))
+
+    async def check(
+        self,
+        session: AsyncSession,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Сравнивает сохраненную статистику с пересчитанной
+        и возвращает расхождения по полям.
+        """
+        stored = await self.get_current(session)
+        actual = await self.calculate(session)
+        return {
+            field: {'stored': getattr(stored, field, None), 'actual': value}
+            for field, value in actual.items()
+            if getattr(stored, field, None) != value
+        }
+
+    async def rebuild(
+        self,
+        session: AsyncSession,
+    ) -> FundStats:
+        """
+        Пересчитывает статистику фонда с нуля.
+        До пересчета блокируется строка статистики (FOR UPDATE;
+        на SQLite - вся БД на запись, см. lock_for_write): запросы,
+        которые уже изменили статистику, фиксируются раньше
+        и попадают в пересчет, а остальные ждут его фиксации
+        и прибавляют свои изменения к новым значениям.
+        """
+        await lock_for_write(session)
+        await session.execute(
+            select(FundStats.id).where(
+                FundStats.id == FUND_STATS_ID
+            ).with_for_update()
+        )
+        actual = await self.calculate(session)
+        result = await session.execute(
+            update(FundStats).where(
+                FundStats.id == FUND_STATS_ID
+            ).values(actual)
+        )
+        if result.rowcount == 0:
+            session.add(FundStats(id=FUND_STATS_ID, **actual))
+        await session.commit()
+        return await self.get_current(session)
+
+
+fund_stats_crud = CRUDFundStats(FundStats)
@@ -2,6 +2,12 @@ from fastapi import FastAPI
 
 from app.api.routers import main_router
 from app.core.config import settings
+from app.core.db import ReplicaLagMiddleware
+from app.core.google_client import google_client
+from app.core.metrics import InstrumentationMiddleware
+from app.core.tracing import get_tracer
+from app.services.allocation import allocation_worker
+from app.services.reports import report_jobs
 
 
 app = FastAPI(
@@ -10,3 +16,36 @@ app = FastAPI(
 )
 
 app.include_router(main_router)
+app.add_middleware(ReplicaLagMiddleware)
+app.add_middleware(InstrumentationMiddleware)
+
+
+@app.on_event('startup')
+async def start_allocation_worker():
+    if settings.allocation_in_background:
+        await allocation_worker.start()
+
+
+@app.on_event('shutdown')
+async def stop_allocation_worker():
+    await allocation_worker.stop()
+
+
+@app.on_event('shutdown')
+async def stop_report_jobs():
+    await report_jobs.stop()
+
+
+@app.on_event('startup')
+async def start_google_client():
+    await google_client.start()
+
+
+@app.on_event('shutdown')
+async def stop_google_client():
+    await google_client.stop()
+
+
+@app.on_event('shutdown')
+def close_tracer():
+    get_tracer().close()
@@ -2,3 +2,5 @@ from .user import User  # noqa
 from .donation import Donation  # noqa
 from .charity_project import CharityProject  # noqa
 from .charity_abstract_base import CharityAbstractBase  # noqa
+from .fund_stats import FundStats  # noqa
+from .report_job import ReportJob  # noqa
@@ -1,6 +1,9 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, Boolean, DateTime, CheckConstraint
+from sqlalchemy import (
+    Column, Integer, Boolean, DateTime, CheckConstraint, Index, text
+)
+from sqlalchemy.orm import declared_attr
 
 from app.core.db import Base
 
@@ -8,17 +11,35 @@ from app.core.db import Base
 class CharityAbstractBase(Base):
     """Абстрактный класс-основа для моделей CharityProject и Donation."""
     __abstract__ = True
-    __table_args__ = (
-        CheckConstraint(
-            'full_amount >= invested_amount', name='amount_ge_invested'
-        ),
-        CheckConstraint(
-            'full_amount >= 1', name='check_amount_positive'
-        ),
-    )
+
+    @declared_attr
+    def __table_args__(cls):
+        return (
+            CheckConstraint(
+                'full_amount >= invested_amount', name='amount_ge_invested'
+            ),
+            CheckConstraint(
+                'full_amount >= 1', name='check_amount_positive'
+            ),
+            # Частичный индекс только по открытым объектам:
+            # по нему идет выборка при распределении инвестиций.
+            Index(
+                f'ix_{cls.__tablename__}_open',
+                'fully_invested', 'create_date', 'id',
+                sqlite_where=text('fully_invested = 0'),
+                postgresql_where=text('fully_invested = false'),
+            ),
+        )
 
     full_amount = Column(Integer, nullable=False)
     invested_amount = Column(Integer, default=0)
     fully_invested = Column(Boolean, default=False)
     create_date = Column(DateTime, default=datetime.utcnow)
     close_date = Column(DateTime, nullable=True)
+    # Версия строки: увеличивается при каждом изменении и позволяет
+    # обнаружить параллельную запись при распределении инвестиций.
+    version = Column(Integer, nullable=False, server_default='1')
+
+    @declared_attr
+    def __mapper_args__(cls):
+        return {'version_id_col': cls.version}
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, Text
+from sqlalchemy import Column, Integer, ForeignKey, Index, Text
 
 from .charity_abstract_base import CharityAbstractBase
 
@@ -16,3 +16,10 @@ class Donation(CharityAbstractBase):
             f'{self.__class__.__name__}: '
             f'{self.full_amount} - {self.create_date}'
         )
+
+
+Index(
+    'ix_donation_user_id_create_date',
+    Donation.user_id,
+    Donation.create_date,
+)
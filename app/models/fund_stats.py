@@ -0,0 +1,41 @@
+from sqlalchemy import DDL, BigInteger, Column, event
+
+from app.core.db import Base
+
+FUND_STATS_ID = 1
+
+
+class FundStats(Base):
+    """
+    Агрегированная статистика фонда: единственная строка,
+    которая обновляется в тех же транзакциях,
+    что и проекты с пожертвованиями.
+    """
+    __tablename__ = 'fund_stats'
+
+    project_count = Column(BigInteger, nullable=False, server_default='0')
+    open_project_count = Column(
+        BigInteger, nullable=False, server_default='0'
+    )
+    requested_amount = Column(BigInteger, nullable=False, server_default='0')
+    donation_count = Column(BigInteger, nullable=False, server_default='0')
+    donated_amount = Column(BigInteger, nullable=False, server_default='0')
+    invested_amount = Column(BigInteger, nullable=False, server_default='0')
+
+    @property
+    def unallocated_amount(self) -> int:
+        """Пожертвованные деньги, еще не внесенные в проекты."""
+        return self.donated_amount - self.invested_amount
+
+    def __repr__(self):
+        return (
+            f'{self.__class__.__name__}: '
+            f'{self.donated_amount} - {self.invested_amount}'
+        )
+
+
+event.listen(
+    FundStats.__table__,
+    'after_create',
+    DDL(f'INSERT INTO fund_stats (id) VALUES ({FUND_STATS_ID})'),
+)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, Integer, String, Text
+
+from app.core.db import Base
+
+
+class ReportJob(Base):
+    """
+    Задача на формирование google-отчета.
+    Хранится в БД, чтобы статус задачи видели все воркеры,
+    а не только процесс, который ее запустил.
+    """
+    __tablename__ = 'report_job'
+
+    id = Column(String(32), primary_key=True)
+    status = Column(String(16), nullable=False)
+    top = Column(Integer)
+    url = Column(String)
+    error = Column(Text)
+    create_date = Column(DateTime, nullable=False, index=True)
+    close_date = Column(DateTime)
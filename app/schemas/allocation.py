@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class AllocationStatus(BaseModel):
+    """Схема для отображения статуса распределения инвестиций."""
+    status: str
+
+
+class AllocationQueueInfo(BaseModel):
+    """Схема для отображения состояния очереди распределения."""
+    background: bool
+    pending: int
@@ -0,0 +1,23 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class FundStatsDB(BaseModel):
+    """Схема для отображения статистики фонда."""
+    project_count: int
+    open_project_count: int
+    requested_amount: int
+    donation_count: int
+    donated_amount: int
+    invested_amount: int
+    unallocated_amount: int
+
+    class Config:
+        orm_mode = True
+
+
+class FundStatsCheck(BaseModel):
+    """Схема для отображения результата проверки статистики фонда."""
+    consistent: bool
+    mismatches: Dict[str, Dict[str, Optional[int]]]
@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ReportJobDB(BaseModel):
+    """Схема для отображения задачи на формирование google-отчета."""
+    id: str
+    status: str
+    top: Optional[int]
+    url: Optional[str]
+    error: Optional[str]
+    create_date: datetime
+    close_date: Optional[datetime]
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import invalidate_projects_cache
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.crud.base import AllocationConflict
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation
+from app.services.investments import allocate, get_cruds, make_investments
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+ALLOCATED = 'allocated'
+FAILED = 'failed'
+
+# Сколько раз объект ставится в очередь, прежде чем считается,
+# что распределить его инвестиции не удалось.
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 0.1
+
+CRUD_BY_TABLE = {
+    CharityProject.__tablename__: charity_project_crud,
+    Donation.__tablename__: donation_crud,
+}
+
+
+class AllocationWorker:
+    """
+    Фоновое распределение инвестиций.
+    Эндпоинты только сохраняют новый объект и ставят его в очередь,
+    а единственный писатель в этом процессе разбирает очередь пачками
+    и распределяет инвестиции, не конкурируя за блокировки
+    с другими запросами.
+    """
+
+    def __init__(self):
+        self.session_factory = AsyncSessionLocal
+        self.queue: Optional[asyncio.Queue] = None
+        self.pending: Set[Tuple[str, int]] = set()
+        self.failed: Set[Tuple[str, int]] = set()
+        self.attempts: Dict[Tuple[str, int], int] = {}
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.task is not None
+
+    async def start(self) -> None:
+        """
+        Запускает обработчик очереди.
+        Перед этим распределяет деньги, оставшиеся нераспределенными,
+        если прошлый процесс остановился, не разобрав очередь.
+        """
+        self.queue = asyncio.Queue()
+        await self.recover()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Дожидается разбора очереди и останавливает обработчик."""
+        if self.task is None:
+            return
+        await self.queue.join()
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def enqueue(self, obj: Union[CharityProject, Donation]) -> None:
+        """Ставит сохраненный в БД объект в очередь на распределение."""
+        key = (obj.__tablename__, obj.id)
+        self.pending.add(key)
+        self.queue.put_nowait(key)
+
+    async def get_status(
+        self,
+        db_obj: Union[CharityProject, Donation],
+        session: AsyncSession,
+    ) -> str:
+        """
+        Возвращает статус распределения инвестиций объекта.
+        Объект из очереди этого процесса ожидает распределения,
+        закрытый объект распределен, а открытый, распределить который
+        не удалось, помечен как failed. Об остальных открытых объектах
+        очередь процесса ничего не знает (их мог поставить в очередь
+        другой воркер), поэтому статус выводится из данных: после
+        распределения либо объект закрыт, либо открытых объектов
+        другого типа не осталось.
+        """
+        key = (db_obj.__tablename__, db_obj.id)
+        if key in self.pending:
+            return PENDING
+        if db_obj.fully_invested:
+            return ALLOCATED
+        if key in self.failed:
+            return FAILED
+        crud, _ = get_cruds(db_obj)
+        if await crud.get_oldest_open_object(session) is not None:
+            return PENDING
+        return ALLOCATED
+
+    async def run(self) -> None:
+        """
+        Разбирает очередь пачками до остановки.
+        Объекты, которые не удалось распределить, ставятся в очередь
+        снова, а после MAX_ATTEMPTS попыток попадают в failed.
+        """
+        while True:
+            batch = [await self.queue.get()]
+            while (
+                len(batch) < settings.allocation_batch_size and
+                not self.queue.empty()
+            ):
+                batch.append(self.queue.get_nowait())
+            try:
+                failed = await self.process_batch(batch)
+            except Exception:
+                logger.exception('Не удалось распределить инвестиции')
+                failed = set(batch)
+            if failed:
+                await asyncio.sleep(RETRY_DELAY)
+            for key in batch:
+                if key in failed:
+                    self.retry(key)
+                else:
+                    self.pending.discard(key)
+                    self.attempts.pop(key, None)
+                self.queue.task_done()
+
+    def retry(self, key: Tuple[str, int]) -> None:
+        """
+        Ставит объект в очередь повторно или,
+        если попытки исчерпаны, помечает его как failed.
+        """
+        self.attempts[key] = self.attempts.get(key, 0) + 1
+        if self.attempts[key] < MAX_ATTEMPTS:
+            self.queue.put_nowait(key)
+            return
+        logger.error(
+            'Инвестиции %s id=%s не распределены после %s попыток',
+            *key, MAX_ATTEMPTS,
+        )
+        self.pending.discard(key)
+        self.attempts.pop(key)
+        self.failed.add(key)
+
+    async def process_batch(
+        self,
+        batch: List[Tuple[str, int]],
+    ) -> Set[Tuple[str, int]]:
+        """
+        Распределяет инвестиции для пачки объектов в одной транзакции.
+        Если это не удалось (например, строку успел изменить
+        параллельный запрос), объекты пачки обрабатываются по одному
+        в отдельных транзакциях с повторами.
+        Возвращает объекты, распределить которые не удалось.
+        """
+        async with self.session_factory() as session:
+            try:
+                for table_name, obj_id in batch:
+                    await self.allocate_one(
+                        table_name, obj_id, allocate, session
+                    )
+                await session.commit()
+                await invalidate_projects_cache(session)
+                return set()
+            except AllocationConflict:
+                await session.rollback()
+            except Exception:
+                logger.warning(
+                    'Пачка не распределена, объекты обрабатываются '
+                    'по одному', exc_info=True,
+                )
+                await session.rollback()
+        failed = set()
+        for table_name, obj_id in batch:
+            try:
+                async with self.session_factory() as session:
+                    await self.allocate_one(
+                        table_name, obj_id, make_investments, session
+                    )
+                    await session.commit()
+                    await invalidate_projects_cache(session)
+            except Exception:
+                logger.exception(
+                    'Не удалось распределить инвестиции %s id=%s',
+                    table_name, obj_id,
+                )
+                failed.add((table_name, obj_id))
+        return failed
+
+    async def allocate_one(
+        self,
+        table_name: str,
+        obj_id: int,
+        allocate_func,
+        session: AsyncSession,
+    ) -> None:
+        """
+        Загружает объект из БД и распределяет его инвестиции,
+        если он еще открыт.
+        """
+        db_obj = await CRUD_BY_TABLE[table_name].get(obj_id, session)
+        if db_obj is None or db_obj.fully_invested:
+            return
+        await allocate_func(db_obj, session)
+        await session.flush()
+
+    async def recover(self) -> None:
+        """
+        Распределяет нераспределенные пожертвования по открытым
+        проектам, начиная с самых старых, пока деньги или проекты
+        не закончатся.
+        """
+        async with self.session_factory() as session:
+            while True:
+                donation = await donation_crud.get_oldest_open_object(
+                    session
+                )
+                if donation is None:
+                    return
+                invested_amount = donation.invested_amount
+                donation = await make_investments(donation, session)
+                allocated = donation.invested_amount != invested_amount
+                await session.commit()
+                await invalidate_projects_cache(session)
+                if not allocated:
+                    return
+
+
+allocation_worker = AllocationWorker()
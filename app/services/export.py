@@ -0,0 +1,211 @@
+import csv
+import io
+import json
+import tempfile
+from datetime import datetime
+from enum import Enum
+from typing import (
+    IO, AsyncIterator, List, Optional, Sequence, Tuple, Union
+)
+
+import openpyxl
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+ROWS_PER_CHUNK = 500
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+class ExportFormat(str, Enum):
+    """Форматы выгрузки данных."""
+    ndjson = 'ndjson'
+    csv = 'csv'
+    xlsx = 'xlsx'
+    parquet = 'parquet'
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: 'application/x-ndjson',
+    ExportFormat.csv: 'text/csv',
+    ExportFormat.xlsx: (
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    ),
+    ExportFormat.parquet: 'application/vnd.apache.parquet',
+}
+
+
+def get_missing_dependency(export_format: ExportFormat) -> Optional[str]:
+    """
+    Возвращает название необязательного пакета,
+    без которого формат недоступен, если он не установлен.
+    """
+    if export_format == ExportFormat.parquet and pyarrow is None:
+        return 'pyarrow'
+    return None
+
+
+def encode_value(value):
+    """Приводит значение из БД к виду, пригодному для выгрузки."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_file(file: IO[bytes]) -> AsyncIterator[bytes]:
+    """Читает готовый временный файл с начала порциями и закрывает его."""
+    try:
+        file.seek(0)
+        while True:
+            chunk = await run_in_threadpool(file.read, FILE_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        file.close()
+
+
+async def render_ndjson(
+    columns: Sequence[str],
+    rows: AsyncIterator[Tuple],
+    column_types: Optional[Sequence[type]] = None,
+) -> AsyncIterator[str]:
+    """Построчно формирует выгрузку в формате NDJSON."""
+    chunk: List[str] = []
+    async for row in rows:
+        chunk.append(json.dumps(
+            {column: encode_value(value)
+             for column, value in zip(columns, row)},
+            ensure_ascii=False,
+        ))
+        if len(chunk) == ROWS_PER_CHUNK:
+            yield '\n'.join(chunk) + '\n'
+            chunk = []
+    if chunk:
+        yield '\n'.join(chunk) + '\n'
+
+
+async def render_csv(
+    columns: Sequence[str],
+    rows: AsyncIterator[Tuple],
+    column_types: Optional[Sequence[type]] = None,
+) -> AsyncIterator[str]:
+    """Построчно формирует выгрузку в формате CSV с заголовком."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows_in_buffer = 0
+    async for row in rows:
+        writer.writerow([encode_value(value) for value in row])
+        rows_in_buffer += 1
+        if rows_in_buffer == ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            rows_in_buffer = 0
+    yield buffer.getvalue()
+
+
+async def render_xlsx(
+    columns: Sequence[str],
+    rows: AsyncIterator[Tuple],
+    column_types: Optional[Sequence[type]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Формирует выгрузку в формате XLSX.
+    Книга открывается в режиме write-only: строки сразу сбрасываются
+    во временный файл openpyxl, а готовый архив отдается
+    из временного файла порциями, так что память не растет
+    с размером выгрузки.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(list(columns))
+    async for row in rows:
+        worksheet.append(list(row))
+    file = tempfile.TemporaryFile()
+    await run_in_threadpool(workbook.save, file)
+    async for chunk in iter_file(file):
+        yield chunk
+
+
+def get_arrow_schema(
+    columns: Sequence[str],
+    column_types: Optional[Sequence[type]],
+):
+    """Схема Arrow по типам колонок; неизвестные типы пишутся строками."""
+    arrow_types = {
+        bool: pyarrow.bool_(),
+        int: pyarrow.int64(),
+        float: pyarrow.float64(),
+        datetime: pyarrow.timestamp('us'),
+        str: pyarrow.string(),
+    }
+    column_types = column_types or [str] * len(columns)
+    return pyarrow.schema([
+        (column, arrow_types.get(column_type, pyarrow.string()))
+        for column, column_type in zip(columns, column_types)
+    ])
+
+
+async def render_parquet(
+    columns: Sequence[str],
+    rows: AsyncIterator[Tuple],
+    column_types: Optional[Sequence[type]] = None,
+) -> AsyncIterator[bytes]:
+    """
+    Формирует выгрузку в формате Parquet.
+    Строки пишутся во временный файл группами по ROWS_PER_CHUNK,
+    в памяти держится только текущая группа.
+    """
+    schema = get_arrow_schema(columns, column_types)
+    file = tempfile.TemporaryFile()
+    writer = pyarrow.parquet.ParquetWriter(file, schema)
+    chunk: List[Tuple] = []
+
+    def write_chunk():
+        writer.write_table(pyarrow.Table.from_pydict(
+            {column: [row[index] for row in chunk]
+             for index, column in enumerate(columns)},
+            schema=schema,
+        ))
+
+    try:
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) == ROWS_PER_CHUNK:
+                await run_in_threadpool(write_chunk)
+                chunk = []
+        if chunk:
+            await run_in_threadpool(write_chunk)
+    finally:
+        writer.close()
+    async for data in iter_file(file):
+        yield data
+
+
+RENDERERS = {
+    ExportFormat.ndjson: render_ndjson,
+    ExportFormat.csv: render_csv,
+    ExportFormat.xlsx: render_xlsx,
+    ExportFormat.parquet: render_parquet,
+}
+
+
+def render_export(
+    export_format: ExportFormat,
+    columns: Sequence[str],
+    rows: AsyncIterator[Tuple],
+    column_types: Optional[Sequence[type]] = None,
+) -> AsyncIterator[Union[str, bytes]]:
+    """
+    Возвращает генератор выгрузки в запрошенном формате.
+    column_types - питоновские типы колонок для форматов
+    со строгой схемой (Parquet).
+    """
+    return RENDERERS[export_format](columns, rows, column_types)
@@ -1,5 +1,7 @@
+import asyncio
 from datetime import datetime
-from typing import List, Dict
+from typing import AsyncIterable, AsyncIterator, Dict, List
+from urllib.parse import urljoin
 
 from aiogoogle import Aiogoogle
 
@@ -7,13 +9,73 @@ from app.core.config import settings
 
 
 FORMAT = "%Y/%m/%d %H:%M:%S"
-ROW_COUNT = 100
-COLUMN_COUNT = 11
-RANGE = 'A1:E30'
+COLUMN_COUNT = 3
+SPREADSHEETS_URL = 'https://docs.google.com/spreadsheets/d/'
+HEADER_ROWS = 3
+# Google советует держать тело запроса в пределах 2 МБ.
+MAX_REQUEST_ROWS = 5000
+MAX_REQUEST_BYTES = 2 * 1024 * 1024
+# Кавычки, запятые и скобки вокруг значений строки в JSON.
+ROW_OVERHEAD_BYTES = 16
 
 
-async def spreadsheets_create(wrapper_services: Aiogoogle) -> str:
-    """Создает google-документ(spreadsheet)."""
+def get_header_rows() -> List[List[str]]:
+    return [
+        ['Отчет от', datetime.now().strftime(FORMAT)],
+        ['Топ проектов по скорости закрытия'],
+        ['Название проекта', 'Время сбора', 'Описание']
+    ]
+
+
+def get_value_range(first_row: int, rows: List[List[str]]) -> Dict:
+    """Диапазон значений, начинающийся со строки first_row."""
+    return {
+        'range': f'A{first_row}:C{first_row + len(rows) - 1}',
+        'majorDimension': 'ROWS',
+        'values': rows,
+    }
+
+
+def get_row_size(row: List[str]) -> int:
+    return sum(
+        len(value.encode()) for value in row
+    ) + ROW_OVERHEAD_BYTES * len(row)
+
+
+async def get_update_data(
+        projects: AsyncIterable[List[Dict[str, str]]]
+) -> AsyncIterator[List[Dict]]:
+    """
+    Разбивает строки отчета на тела запросов values.batchUpdate
+    не больше MAX_REQUEST_ROWS строк и MAX_REQUEST_BYTES байт.
+    Первое тело всегда содержит шапку отчета,
+    в памяти держится только одно тело запроса.
+    """
+    data = [get_value_range(1, get_header_rows())]
+    first_row = HEADER_ROWS + 1
+    rows = []
+    size = 0
+    async for chunk in projects:
+        for project in chunk:
+            row = [project['name'], project['period'], project['description']]
+            rows.append(row)
+            size += get_row_size(row)
+            if len(rows) >= MAX_REQUEST_ROWS or size >= MAX_REQUEST_BYTES:
+                data.append(get_value_range(first_row, rows))
+                yield data
+                first_row += len(rows)
+                data, rows, size = [], [], 0
+    if rows:
+        data.append(get_value_range(first_row, rows))
+    if data:
+        yield data
+
+
+async def spreadsheets_create(
+        row_count: int,
+        wrapper_services: Aiogoogle
+) -> str:
+    """Создает google-документ(spreadsheet) под row_count строк."""
     now_date_time = datetime.now().strftime(FORMAT)
     service = await wrapper_services.discover('sheets', 'v4')
     spreadsheet_body = {
@@ -24,7 +86,7 @@ async def spreadsheets_create(wrapper_services: Aiogoogle) -> str:
                 'properties': {'sheetType': 'GRID',
                                'sheetId': 0,
                                'title': 'Лист1',
-                               'gridProperties': {'rowCount': ROW_COUNT,
+                               'gridProperties': {'rowCount': row_count,
                                                   'columnCount': COLUMN_COUNT}}
             }
         ]
@@ -55,33 +117,46 @@ async def set_user_permissions(
 
 async def spreadsheets_update_value(
         spreadsheet_id: str,
-        projects: List[Dict[str, str]],
+        data: List[Dict],
         wrapper_services: Aiogoogle
 ) -> None:
-    """Вносит данные в google-документ."""
-    now_date_time = datetime.now().strftime(FORMAT)
+    """Вносит в google-документ данные нескольких диапазонов."""
     service = await wrapper_services.discover('sheets', 'v4')
-    table_values = [
-        ['Отчет от', now_date_time],
-        ['Топ проектов по скорости закрытия'],
-        ['Название проекта', 'Время сбора', 'Описание']
-    ]
-    table_values.extend(
-        [
-            [project['name'], project['period'], project['description']]
-            for project in projects
-        ]
-    )
-
     update_body = {
-        'majorDimension': 'ROWS',
-        'values': table_values
+        'valueInputOption': 'USER_ENTERED',
+        'data': data
     }
     await wrapper_services.as_service_account(
-        service.spreadsheets.values.update(
+        service.spreadsheets.values.batchUpdate(
             spreadsheetId=spreadsheet_id,
-            range=RANGE,
-            valueInputOption='USER_ENTERED',
             json=update_body
         )
     )
+
+
+async def create_report(
+        projects: AsyncIterable[List[Dict[str, str]]],
+        project_count: int,
+        wrapper_services: Aiogoogle
+) -> str:
+    """
+    Создает google-отчет по проектам, приходящим частями,
+    открывает к нему доступ и возвращает ссылку на документ.
+    Лист создается ровно под project_count строк данных,
+    доступ открывается одновременно с первой записью.
+    """
+    spreadsheet_id = await spreadsheets_create(
+        HEADER_ROWS + project_count, wrapper_services
+    )
+    update_data = get_update_data(projects)
+    await asyncio.gather(
+        set_user_permissions(spreadsheet_id, wrapper_services),
+        spreadsheets_update_value(
+            spreadsheet_id, await update_data.__anext__(), wrapper_services
+        ),
+    )
+    async for data in update_data:
+        await spreadsheets_update_value(
+            spreadsheet_id, data, wrapper_services
+        )
+    return urljoin(SPREADSHEETS_URL, spreadsheet_id)
@@ -1,13 +1,24 @@
+import asyncio
+import random
 from datetime import datetime
-from typing import List, Union
+from typing import Iterator, List, Optional, Tuple, Union
 
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import mark_projects_changed
+from app.core.db import lock_for_write
+from app.core.tracing import start_span
 from app.models import CharityProject, Donation
+from app.crud.base import AllocationConflict, CRUDBase
 from app.crud.charity_project import charity_project_crud
 from app.crud.donation import donation_crud
 
 
+ALLOCATION_ATTEMPTS = 10
+RETRY_DELAY = 0.01
+
+
 async def check_if_ready_and_close(
     obj: Union[CharityProject, Donation]
 ) -> Union[CharityProject, Donation]:
@@ -30,39 +41,159 @@ async def get_uninvested_amount(
     return obj.full_amount - obj.invested_amount
 
 
-async def make_investments(
+def get_cruds(
+    new_obj: Union[CharityProject, Donation],
+) -> Tuple[CRUDBase, CRUDBase]:
+    """
+    Возвращает CRUD открытых объектов, между которыми распределяется
+    новый объект, и CRUD самого нового объекта.
+    """
+    if isinstance(new_obj, CharityProject):
+        return donation_crud, charity_project_crud
+    return charity_project_crud, donation_crud
+
+
+def spread_investment(
+    amount: int,
     new_obj: Union[CharityProject, Donation],
+    new_objs_left: Iterator[Union[CharityProject, Donation]],
+) -> Optional[Union[CharityProject, Donation]]:
+    """
+    Вносит сумму amount в новые объекты по очереди, начиная с new_obj.
+    Возвращает первый еще не заполненный объект.
+    """
+    while amount:
+        invested = min(amount, new_obj.full_amount - new_obj.invested_amount)
+        new_obj.invested_amount += invested
+        amount -= invested
+        if new_obj.invested_amount == new_obj.full_amount:
+            new_obj = next(new_objs_left, None)
+    return new_obj
+
+
+async def allocate_batch(
+    new_objs: List[Union[CharityProject, Donation]],
     session: AsyncSession,
 ) -> List[Union[CharityProject, Donation]]:
     """
-    Распределяет инвестиции по проектам и вносит
-    соответствующие изменения в проекты и пожертвования
-    (статус (открыт / закрыт), дата закрытия,
-    фактическая сумма инвестиций).
+    Один проход распределения инвестиций для пачки новых объектов
+    одного типа с тем же результатом, что и их обработка по очереди.
+    Открытые объекты заполняются в порядке создания: они читаются
+    постранично, пока не будет распределена сумма всей пачки,
+    а изменения вносятся групповыми UPDATE-запросами.
+    Статистика фонда обновляется в той же транзакции; изменения
+    новых объектов в ней учтет commit_creation, а для уже
+    сохраненных объектов они учитываются здесь.
     """
-    objects_to_be_comitted = []
+    crud, new_obj_crud = get_cruds(new_objs[0])
+    await lock_for_write(session)
+    amount_to_allocate = 0
+    stats_before = {}
+    for new_obj in new_objs:
+        amount_to_allocate += await get_uninvested_amount(new_obj)
+        if inspect(new_obj).persistent:
+            stats_before[id(new_obj)] = new_obj_crud.get_stats(new_obj)
+    amount_left = amount_to_allocate
+    new_objs_left = iter(new_objs)
+    new_obj = next(new_objs_left)
+    objects_to_close = []
+    with start_span('allocate', model=crud.model.__tablename__) as span:
+        async for obj_id, uninvested, version in crud.iterate_open_objects(
+            amount_to_allocate, session
+        ):
+            span.add('rows_examined')
+            amount_to_invest = min(amount_left, uninvested)
+            amount_left -= amount_to_invest
+            if amount_to_invest == uninvested:
+                objects_to_close.append((obj_id, version))
+            else:
+                await crud.add_investment(
+                    obj_id, version, amount_to_invest, session
+                )
+                span.add('rows_modified')
+            new_obj = spread_investment(
+                amount_to_invest, new_obj, new_objs_left
+            )
+            if amount_left == 0:
+                break
+        span.set_attribute('amount', amount_to_allocate - amount_left)
 
-    if isinstance(new_obj, CharityProject):
-        open_investments = await donation_crud.get_open_objects(session)
-    elif isinstance(new_obj, Donation):
-        open_investments = await charity_project_crud.get_open_objects(
-            session
+    with start_span('persist', model=crud.model.__tablename__) as span:
+        await crud.close_objects(objects_to_close, session)
+        span.set_attribute('rows_modified', len(objects_to_close))
+        await crud.update_stats(
+            crud.get_allocation_stats(
+                amount_to_allocate - amount_left, len(objects_to_close)
+            ),
+            session,
         )
+        if crud is donation_crud or amount_to_allocate != amount_left:
+            mark_projects_changed(session)
+        for new_obj in new_objs:
+            await check_if_ready_and_close(new_obj)
+            if id(new_obj) in stats_before:
+                await new_obj_crud.update_object_stats(
+                    new_obj, stats_before[id(new_obj)], session
+                )
+    return new_objs
 
-    while not new_obj.fully_invested and open_investments:
-        open_investments_obj = open_investments.pop(0)
-        amount_to_invest = min(
-            await get_uninvested_amount(new_obj),
-            await get_uninvested_amount(open_investments_obj)
-        )
 
-        new_obj.invested_amount += amount_to_invest
-        new_obj = await check_if_ready_and_close(new_obj)
+async def allocate(
+    new_obj: Union[CharityProject, Donation],
+    session: AsyncSession,
+) -> Union[CharityProject, Donation]:
+    """Один проход распределения инвестиций для нового объекта."""
+    (new_obj,) = await allocate_batch([new_obj], session)
+    return new_obj
+
+
+async def make_batch_investments(
+    new_objs: List[Union[CharityProject, Donation]],
+    session: AsyncSession,
+) -> List[Union[CharityProject, Donation]]:
+    """
+    Распределяет инвестиции для пачки новых объектов одного типа
+    в одной транзакции, как make_investments для каждого по очереди.
+
+    Если открытый объект все же был изменен параллельным запросом
+    (версия строки не совпала), транзакция откатывается
+    и распределение повторяется со свежими данными.
+    """
+    invested_amounts = [new_obj.invested_amount for new_obj in new_objs]
+    with start_span(
+        'make_investments',
+        model=new_objs[0].__tablename__,
+        batch_size=len(new_objs),
+    ) as span:
+        for attempt in range(1, ALLOCATION_ATTEMPTS + 1):
+            span.set_attribute('attempts', attempt)
+            try:
+                return await allocate_batch(new_objs, session)
+            except AllocationConflict:
+                if attempt == ALLOCATION_ATTEMPTS:
+                    raise
+                await session.rollback()
+                for new_obj, invested_amount in zip(
+                    new_objs, invested_amounts
+                ):
+                    if inspect(new_obj).persistent:
+                        await session.refresh(new_obj)
+                    else:
+                        new_obj.invested_amount = invested_amount
+                await asyncio.sleep(random.uniform(0, RETRY_DELAY * attempt))
 
-        open_investments_obj.invested_amount += amount_to_invest
-        open_investments_obj = await check_if_ready_and_close(
-            open_investments_obj
-        )
-        objects_to_be_comitted.append(open_investments_obj)
 
-    return new_obj, objects_to_be_comitted
+async def make_investments(
+    new_obj: Union[CharityProject, Donation],
+    session: AsyncSession,
+) -> Union[CharityProject, Donation]:
+    """
+    Распределяет инвестиции по проектам и вносит
+    соответствующие изменения в проекты и пожертвования
+    (статус (открыт / закрыт), дата закрытия,
+    фактическая сумма инвестиций).
+    Параллельные изменения обрабатываются повторами,
+    как в make_batch_investments.
+    """
+    (new_obj,) = await make_batch_investments([new_obj], session)
+    return new_obj
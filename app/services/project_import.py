@@ -0,0 +1,29 @@
+import csv
+import io
+from typing import List
+
+from pydantic import parse_obj_as
+
+from app.schemas.charity_project import CharityProjectCreate
+
+
+CSV_COLUMNS = ('name', 'description', 'full_amount')
+
+
+def parse_projects_csv(content: bytes) -> List[CharityProjectCreate]:
+    """
+    Разбирает CSV с колонками name, description, full_amount
+    (первая строка - заголовок) в список схем новых проектов.
+    Некорректные строки поднимают ValidationError, отсутствие нужных
+    колонок в заголовке - ValueError.
+    """
+    reader = csv.DictReader(io.StringIO(content.decode('utf-8-sig')))
+    missing_columns = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing_columns:
+        raise ValueError(
+            'В CSV нет колонок: ' + ', '.join(sorted(missing_columns))
+        )
+    return parse_obj_as(
+        List[CharityProjectCreate],
+        [{column: row[column] for column in CSV_COLUMNS} for row in reader],
+    )
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Set
+
+from aiogoogle import Aiogoogle
+from cachetools import TTLCache
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.db import AsyncReadSessionLocal, AsyncSessionLocal
+from app.core.google_client import open_service
+from app.crud.charity_project import charity_project_crud
+from app.models import ReportJob
+from app.schemas.report import ReportJobDB
+from app.services.google_api import create_report
+
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+async def build_report(
+        session: AsyncSession,
+        wrapper_services: Aiogoogle,
+        top: Optional[int] = None,
+) -> str:
+    """
+    Строит google-отчет по закрытым проектам, читая их из БД частями.
+    Проекты, закрытые после подсчета строк, в отчет не попадают,
+    чтобы данные не вышли за размер листа.
+    """
+    project_count = await charity_project_crud.count_closed_projects(
+        session, limit=top
+    )
+    projects = charity_project_crud.iter_projects_by_completion_rate(
+        session, limit=project_count
+    )
+    return await create_report(projects, project_count, wrapper_services)
+
+
+class ReportJobBackend:
+    """
+    Интерфейс хранилища задач на формирование отчетов.
+    Методы асинхронные, чтобы хранилище в памяти процесса
+    можно было заменить общим для всех воркеров.
+    """
+
+    async def get(self, job_id: str) -> Optional[ReportJobDB]:
+        raise NotImplementedError
+
+    async def set(self, job: ReportJobDB) -> None:
+        raise NotImplementedError
+
+
+class MemoryReportJobBackend(ReportJobBackend):
+    """
+    Задачи в памяти процесса: статус задачи виден
+    только в воркере, который ее запустил.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.storage = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, job_id: str) -> Optional[ReportJobDB]:
+        job = self.storage.get(job_id)
+        return None if job is None else job.copy()
+
+    async def set(self, job: ReportJobDB) -> None:
+        self.storage[job.id] = job.copy()
+
+
+class DatabaseReportJobBackend(ReportJobBackend):
+    """
+    Задачи в таблице report_job основной БД: статус задачи
+    виден во всех воркерах. Задачи старше ttl секунд
+    не возвращаются и удаляются при сохранении следующих.
+    """
+
+    def __init__(self, session_factory, ttl: int):
+        self.session_factory = session_factory
+        self.ttl = ttl
+
+    def get_expiration_date(self) -> datetime:
+        return datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    async def get(self, job_id: str) -> Optional[ReportJobDB]:
+        async with self.session_factory() as session:
+            job = await session.get(ReportJob, job_id)
+        if job is None or job.create_date < self.get_expiration_date():
+            return None
+        return ReportJobDB.from_orm(job)
+
+    async def set(self, job: ReportJobDB) -> None:
+        async with self.session_factory() as session:
+            await session.merge(ReportJob(**job.dict()))
+            await session.execute(
+                delete(ReportJob).where(
+                    ReportJob.create_date < self.get_expiration_date()
+                )
+            )
+            await session.commit()
+
+
+def make_report_job_backend() -> ReportJobBackend:
+    """Хранилище задач, выбранное настройкой report_job_storage."""
+    if settings.report_job_storage == 'database':
+        return DatabaseReportJobBackend(
+            AsyncSessionLocal, settings.report_job_ttl
+        )
+    return MemoryReportJobBackend(
+        settings.cache_maxsize, settings.report_job_ttl
+    )
+
+
+class ReportJobs:
+    """
+    Фоновое формирование google-отчетов.
+    Запрос только создает задачу и сразу возвращает ее id,
+    отчет строится в отдельной задаче asyncio, а клиент
+    опрашивает ее статус и получает ссылку на документ.
+    Хранилище задач можно заменить, присвоив атрибуту backend
+    другую реализацию ReportJobBackend.
+    """
+
+    def __init__(self):
+        self.session_factory = AsyncReadSessionLocal or AsyncSessionLocal
+        self.service_factory = open_service
+        self.backend = make_report_job_backend()
+        self.tasks: Set[asyncio.Task] = set()
+
+    async def create(self, top: Optional[int] = None) -> ReportJobDB:
+        """Создает задачу на формирование отчета и запускает ее."""
+        job = ReportJobDB(
+            id=uuid.uuid4().hex,
+            status=PENDING,
+            top=top,
+            create_date=datetime.utcnow(),
+        )
+        await self.backend.set(job)
+        task = asyncio.create_task(self.run(job))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return job
+
+    async def get(self, job_id: str) -> Optional[ReportJobDB]:
+        return await self.backend.get(job_id)
+
+    async def run(self, job: ReportJobDB) -> None:
+        """Строит отчет и сохраняет в задаче ссылку или ошибку."""
+        job.status = RUNNING
+        await self.backend.set(job)
+        try:
+            async with self.session_factory() as session:
+                async with self.service_factory() as wrapper_services:
+                    job.url = await build_report(
+                        session, wrapper_services, job.top
+                    )
+            job.status = DONE
+        except Exception as error:
+            logger.exception('Не удалось сформировать отчет %s', job.id)
+            job.status = FAILED
+            job.error = str(error)
+        job.close_date = datetime.utcnow()
+        await self.backend.set(job)
+
+    async def stop(self) -> None:
+        """Отменяет незавершенные задачи."""
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+report_jobs = ReportJobs()
@@ -0,0 +1,352 @@
+"""
+Скорость распределения инвестиций и основных эндпоинтов
+на синтетических данных разного объема.
+
+Для каждого объема (по умолчанию 1 000, 100 000 и 1 000 000 строк)
+бенчмарк создает отдельную базу SQLite во временном каталоге
+и заполняет ее генератором данных: старшие пожертвования
+распределены по закрытым проектам, а половина проектов и новая
+половина пожертвований открыты, чтобы распределение шло в обе
+стороны. Затем замеряются:
+make_investments для нового пожертвования, POST /donation/,
+POST /charity_project/, первая страница GET /charity_project/
+без кэша, отчет о скорости закрытия (top 100) и полная выгрузка
+отчета GET /export/report.
+
+Запросы к эндпоинтам передаются приложению напрямую по ASGI, минуя
+сеть; аутентификация подменяется заранее созданным суперпользователем.
+Результаты печатаются таблицей и сохраняются в JSON (--output),
+чтобы сравнивать их между версиями (--baseline).
+
+Запуск из корня проекта:
+    python -m benchmarks.allocation --sizes 1000 100000 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import sqlalchemy
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.core.cache import charity_project_list_cache
+from app.core.db import get_async_session, make_engine
+from app.core.user import current_superuser, current_user
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.crud.fund_stats import fund_stats_crud
+from app.main import app
+from app.models import CharityProject, Donation, User
+from app.schemas.donation import DonationCreate
+from app.services.investments import make_investments
+from benchmarks.asgi import asgi_request
+
+SIZES = (1000, 100000, 1000000)
+INSERT_CHUNK = 10000
+PROJECT_AMOUNT = 1000
+# Пожертвование, которое закрывает два открытых проекта
+# и частично заполняет третий.
+DONATION_AMOUNT = PROJECT_AMOUNT * 2 + PROJECT_AMOUNT // 2
+START_DATE = datetime(2020, 1, 1)
+SEED = 20221018
+
+
+def generate_projects(size: int, rng: random.Random):
+    """Проекты: четные закрыты за случайное время, нечетные открыты."""
+    for number in range(size):
+        create_date = START_DATE + timedelta(seconds=number)
+        closed = number % 2 == 0
+        yield {
+            'name': f'project {number}',
+            'description': f'synthetic project {number}',
+            'full_amount': PROJECT_AMOUNT,
+            'invested_amount': PROJECT_AMOUNT if closed else 0,
+            'fully_invested': closed,
+            'create_date': create_date,
+            'close_date': (
+                create_date + timedelta(seconds=rng.randint(1, 10 ** 7))
+                if closed else None
+            ),
+            'version': 1,
+        }
+
+
+def generate_donations(size: int, user_id: int):
+    """
+    Пожертвования: старшие полностью распределены по закрытым
+    проектам (их столько же, сколько закрытых проектов),
+    новые открыты и еще не распределены.
+    """
+    closed_count = (size + 1) // 2
+    for number in range(size):
+        create_date = START_DATE + timedelta(seconds=number)
+        closed = number < closed_count
+        yield {
+            'user_id': user_id,
+            'comment': f'synthetic donation {number}',
+            'full_amount': PROJECT_AMOUNT,
+            'invested_amount': PROJECT_AMOUNT if closed else 0,
+            'fully_invested': closed,
+            'create_date': create_date,
+            'close_date': create_date if closed else None,
+            'version': 1,
+        }
+
+
+async def insert_chunks(connection, model, rows) -> None:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == INSERT_CHUNK:
+            await connection.execute(insert(model), chunk)
+            chunk = []
+    if chunk:
+        await connection.execute(insert(model), chunk)
+
+
+async def seed(engine, session_factory, size: int) -> User:
+    """
+    Пересоздает таблицы и заполняет их size проектами
+    и size пожертвованиями, пересчитывает статистику фонда.
+    """
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        result = await connection.execute(insert(User).values(
+            email='benchmark@example.com',
+            hashed_password='',
+            is_active=True,
+            is_superuser=True,
+            is_verified=True,
+        ))
+        user_id = result.inserted_primary_key[0]
+        await insert_chunks(
+            connection, CharityProject,
+            generate_projects(size, random.Random(SEED)),
+        )
+        await insert_chunks(
+            connection, Donation, generate_donations(size, user_id)
+        )
+    async with session_factory() as session:
+        await fund_stats_crud.rebuild(session)
+        return await session.get(User, user_id)
+
+
+async def request(method: str, path: str, body=None) -> int:
+    status, _ = await asgi_request(app, method, path, body)
+    return status
+
+
+def get_cases(session_factory):
+    """Замеряемые операции: имя и корутина одного прогона."""
+    counter = iter(range(10 ** 9))
+
+    async def allocate_donation():
+        async with session_factory() as session:
+            donation = await donation_crud.create_db_object(
+                DonationCreate(full_amount=DONATION_AMOUNT)
+            )
+            donation = await make_investments(donation, session)
+            await donation_crud.commit_creation(donation, session)
+
+    async def post_donation():
+        return await request(
+            'POST', '/donation/', {'full_amount': DONATION_AMOUNT}
+        )
+
+    async def post_charity_project():
+        return await request('POST', '/charity_project/', {
+            'name': f'benchmark project {next(counter)}',
+            'description': 'benchmark',
+            'full_amount': PROJECT_AMOUNT,
+        })
+
+    async def get_charity_projects():
+        await charity_project_list_cache.invalidate()
+        return await request('GET', '/charity_project/')
+
+    async def completion_report():
+        async with session_factory() as session:
+            await charity_project_crud.get_projects_by_completion_rate(
+                session, limit=100
+            )
+
+    async def export_report():
+        return await request('GET', '/export/report')
+
+    return [
+        ('make_investments', allocate_donation),
+        ('POST /donation/', post_donation),
+        ('POST /charity_project/', post_charity_project),
+        ('GET /charity_project/', get_charity_projects),
+        ('completion report top 100', completion_report),
+        ('GET /export/report', export_report),
+    ]
+
+
+async def measure(case, repeat: int, max_seconds: float) -> list:
+    """
+    Запускает операцию repeat раз, но не дольше max_seconds
+    (хотя бы один раз), и возвращает длительности прогонов.
+    """
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < repeat and (
+        not timings or time.perf_counter() < deadline
+    ):
+        start = time.perf_counter()
+        status = await case()
+        timings.append(time.perf_counter() - start)
+        if status is not None and status >= 400:
+            raise RuntimeError(f'Запрос завершился со статусом {status}')
+    return timings
+
+
+def summarize(name: str, size: int, timings: list) -> dict:
+    return {
+        'name': name,
+        'rows': size,
+        'runs': len(timings),
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'mean': statistics.mean(timings),
+        'max': max(timings),
+        'stdev': statistics.stdev(timings) if len(timings) > 1 else 0.0,
+    }
+
+
+async def run_size(database_url: str, size: int, args) -> list:
+    engine = make_engine(database_url)
+    session_factory = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    seed_start = time.perf_counter()
+    user = await seed(engine, session_factory, size)
+    print(f'{size} rows seeded in {time.perf_counter() - seed_start:.1f}s')
+
+    async def get_session():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_session
+    app.dependency_overrides[current_user] = lambda: user
+    app.dependency_overrides[current_superuser] = lambda: user
+    results = []
+    try:
+        for name, case in get_cases(session_factory):
+            if args.only and name not in args.only:
+                continue
+            await case()
+            timings = await measure(case, args.repeat, args.max_seconds)
+            results.append(summarize(name, size, timings))
+            print_result(results[-1])
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+    return results
+
+
+def print_result(result: dict, baseline: dict = None) -> None:
+    line = (
+        f'{result["name"]:<28} {result["rows"]:>9} rows '
+        f'median={result["median"] * 1000:10.2f}ms '
+        f'min={result["min"] * 1000:10.2f}ms runs={result["runs"]}'
+    )
+    if baseline is not None:
+        line += f' x{result["median"] / baseline["median"]:.2f} vs baseline'
+    print(line)
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline_path: Path) -> None:
+    """Печатает отношение медиан к результатам из файла baseline."""
+    baseline = {
+        (result['name'], result['rows']): result
+        for result in json.loads(baseline_path.read_text())['results']
+    }
+    print(f'\nСравнение с {baseline_path}:')
+    for result in results:
+        previous = baseline.get((result['name'], result['rows']))
+        if previous is not None:
+            print_result(result, previous)
+
+
+async def run(args) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            database_url = args.database_url or (
+                f'sqlite+aiosqlite:///{Path(tmp_dir) / f"bench_{size}.db"}'
+            )
+            results.extend(await run_size(database_url, size, args))
+    return results
+
+
+def main(args) -> None:
+    results = asyncio.run(run(args))
+    report = {
+        'date': datetime.utcnow().isoformat(),
+        'commit': get_git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'database': (
+            args.database_url.split(':')[0] if args.database_url
+            else 'sqlite+aiosqlite'
+        ),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f'Результаты сохранены в {args.output}')
+    if args.baseline is not None:
+        compare(results, args.baseline)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument(
+        '--sizes', type=int, nargs='+', default=list(SIZES),
+        help='число проектов и пожертвований в базе',
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='прогонов каждой операции'
+    )
+    parser.add_argument(
+        '--max-seconds', type=float, default=30,
+        help='ограничение времени на одну операцию',
+    )
+    parser.add_argument(
+        '--only', nargs='+', help='замерять только указанные операции'
+    )
+    parser.add_argument(
+        '--database-url',
+        help='база для замеров вместо временного файла SQLite; '
+             'ее таблицы будут пересозданы',
+    )
+    parser.add_argument('--output', type=Path, help='файл для результатов')
+    parser.add_argument(
+        '--baseline', type=Path, help='результаты для сравнения'
+    )
+    main(parser.parse_args())
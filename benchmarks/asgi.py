@@ -0,0 +1,74 @@
+"""Запросы к ASGI-приложению в том же процессе, без сети."""
+import asyncio
+import json
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    body=None,
+    form: Optional[Dict[str, str]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    query: str = '',
+) -> Tuple[int, bytes]:
+    """
+    Передает запрос приложению по ASGI и вычитывает ответ целиком.
+    body отправляется как JSON, form - как форма.
+    Возвращает статус-код и тело ответа.
+    """
+    if form is not None:
+        payload = urlencode(form).encode()
+        content_type = b'application/x-www-form-urlencoded'
+    else:
+        payload = json.dumps(body).encode() if body is not None else b''
+        content_type = b'application/json'
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [
+            (b'host', b'benchmark'),
+            (b'content-type', content_type),
+            (b'content-length', str(len(payload)).encode()),
+        ] + [
+            (name.lower().encode(), value.encode())
+            for name, value in (headers or {}).items()
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('benchmark', 80),
+    }
+    request_sent = False
+    response_complete = asyncio.Event()
+    status = None
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            # Клиент остается подключенным, пока не дочитает ответ:
+            # иначе потоковый ответ прервется.
+            await response_complete.wait()
+            return {'type': 'http.disconnect'}
+        request_sent = True
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            return
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            response_complete.set()
+
+    await app(scope, receive, send)
+    return status, b''.join(chunks)
@@ -0,0 +1,119 @@
+"""
+Пропускная способность распределения пожертвований в одни и те же
+открытые проекты: последовательно и параллельно.
+
+Бенчмарк создает во временном каталоге базу SQLite (или пересоздает
+таблицы в --database-url), открытые проекты и создает пожертвования
+через make_investments сначала по одному, затем с заданным числом
+одновременных транзакций. Печатается число пожертвований в секунду
+в обоих режимах и их отношение: при параллельной работе
+распределение не должно заметно замедляться из-за конфликтов
+и повторов.
+
+Запуск из корня проекта:
+    python -m benchmarks.contention --donations 200 --concurrency 40
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.base import Base
+from app.core.db import make_engine
+from app.crud.donation import donation_crud
+from app.crud.fund_stats import fund_stats_crud
+from app.models import CharityProject
+from app.schemas.donation import DonationCreate
+from app.services.investments import make_investments
+
+DONATION_AMOUNT = 30
+
+
+async def seed(engine, session_factory, args) -> None:
+    """Пересоздает таблицы и открытые проекты на все пожертвования."""
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(insert(CharityProject), [
+            {
+                'name': f'project {number}',
+                'description': 'contention benchmark',
+                'full_amount': (
+                    2 * args.donations * DONATION_AMOUNT // args.projects
+                ),
+            }
+            for number in range(args.projects)
+        ])
+    async with session_factory() as session:
+        await fund_stats_crud.rebuild(session)
+
+
+async def run_donations(session_factory, count: int,
+                        concurrency: int) -> float:
+    """Создает count пожертвований и возвращает их число в секунду."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create_donation():
+        async with semaphore:
+            async with session_factory() as session:
+                donation = await donation_crud.create_db_object(
+                    DonationCreate(full_amount=DONATION_AMOUNT)
+                )
+                donation = await make_investments(donation, session)
+                await donation_crud.commit_creation(donation, session)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(create_donation() for _ in range(count)))
+    return count / (time.perf_counter() - start)
+
+
+async def run(database_url: str, args) -> None:
+    engine = make_engine(database_url)
+    session_factory = sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    try:
+        await seed(engine, session_factory, args)
+        sequential = await run_donations(session_factory, args.donations, 1)
+        concurrent = await run_donations(
+            session_factory, args.donations, args.concurrency
+        )
+    finally:
+        await engine.dispose()
+    print(f'sequential:     {sequential:8.1f} donations/s')
+    print(
+        f'concurrency={args.concurrency:<3} {concurrent:8.1f} donations/s '
+        f'x{concurrent / sequential:.2f}'
+    )
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = args.database_url or (
+            f'sqlite+aiosqlite:///{Path(tmp_dir) / "contention.db"}'
+        )
+        asyncio.run(run(database_url, args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument(
+        '--donations', type=int, default=200,
+        help='пожертвований в каждом режиме',
+    )
+    parser.add_argument(
+        '--concurrency', type=int, default=40,
+        help='одновременных транзакций в параллельном режиме',
+    )
+    parser.add_argument(
+        '--database-url',
+        help='база для замеров вместо временного файла SQLite; '
+             'ее таблицы будут пересозданы',
+    )
+    main(parser.parse_args())
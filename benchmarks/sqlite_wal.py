@@ -0,0 +1,156 @@
+"""
+Пропускная способность SQLite при параллельном чтении и записи
+в режимах журнала DELETE (по умолчанию в SQLite) и WAL.
+
+Бенчмарк работает с копией базы (по умолчанию ./fastapi.db),
+поэтому исходный файл не изменяется. Читатели и писатели запускаются
+в отдельных процессах, как воркеры uvicorn: писатели создают
+пожертвования с распределением по проектам, читатели запрашивают
+страницы проектов.
+
+Запуск из корня проекта:
+    python -m benchmarks.sqlite_wal --database fastapi.db --duration 5
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.base import Base
+from app.core.config import settings
+from app.core.db import make_engine
+from app.crud.charity_project import charity_project_crud
+from app.crud.donation import donation_crud
+from app.models import CharityProject
+from app.schemas.donation import DonationCreate
+from app.services.investments import make_investments
+
+MODES = (
+    ('DELETE', 'FULL'),
+    ('WAL', 'NORMAL'),
+)
+PROJECTS_COUNT = 100
+PROJECT_AMOUNT = 10 ** 9
+TASKS_PER_PROCESS = 4
+
+
+def get_session_factory(database: Path, journal_mode: str, synchronous: str):
+    settings.sqlite_journal_mode = journal_mode
+    settings.sqlite_synchronous = synchronous
+    engine = make_engine(f'sqlite+aiosqlite:///{database}')
+    return engine, sessionmaker(engine, class_=AsyncSession)
+
+
+async def prepare(database: Path, journal_mode: str, synchronous: str):
+    """
+    Создает таблицы и открытые проекты,
+    чтобы писателям было куда вкладывать.
+    """
+    engine, session_factory = get_session_factory(
+        database, journal_mode, synchronous
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    async with session_factory() as session:
+        session.add_all(
+            CharityProject(
+                name=f'benchmark {time.time_ns()} {number}',
+                description='benchmark',
+                full_amount=PROJECT_AMOUNT,
+            )
+            for number in range(PROJECTS_COUNT)
+        )
+        await session.commit()
+    await engine.dispose()
+
+
+async def write(session_factory) -> None:
+    async with session_factory() as session:
+        donation = await donation_crud.create_db_object(
+            DonationCreate(full_amount=100)
+        )
+        donation = await make_investments(donation, session)
+        await donation_crud.commit_creation(donation, session)
+
+
+async def read(session_factory) -> None:
+    async with session_factory() as session:
+        await charity_project_crud.get_multi(session, limit=100)
+
+
+async def run_process(role: str, database: Path, journal_mode: str,
+                      synchronous: str, deadline: float) -> int:
+    engine, session_factory = get_session_factory(
+        database, journal_mode, synchronous
+    )
+    operation = write if role == 'writes' else read
+    count = 0
+
+    async def worker():
+        nonlocal count
+        while time.time() < deadline:
+            await operation(session_factory)
+            count += 1
+
+    await asyncio.gather(*(worker() for _ in range(TASKS_PER_PROCESS)))
+    await engine.dispose()
+    return count
+
+
+def process_entrypoint(*args) -> int:
+    return asyncio.run(run_process(*args))
+
+
+def run_mode(database: Path, journal_mode: str, synchronous: str,
+             args) -> dict:
+    asyncio.run(prepare(database, journal_mode, synchronous))
+    roles = ['reads'] * args.readers + ['writes'] * args.writers
+    deadline = time.time() + args.duration
+    with ProcessPoolExecutor(len(roles)) as executor:
+        futures = [
+            (role, executor.submit(
+                process_entrypoint, role, database, journal_mode,
+                synchronous, deadline,
+            ))
+            for role in roles
+        ]
+        result = {'reads': 0, 'writes': 0}
+        for role, future in futures:
+            result[role] += future.result()
+    return {
+        operation: count / args.duration
+        for operation, count in result.items()
+    }
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for journal_mode, synchronous in MODES:
+            database = Path(tmp_dir) / f'{journal_mode.lower()}.db'
+            if args.database.exists():
+                shutil.copyfile(args.database, database)
+            result = run_mode(database, journal_mode, synchronous, args)
+            print(
+                f'{journal_mode:<6} synchronous={synchronous:<6} '
+                f'reads/s={result["reads"]:8.1f} '
+                f'writes/s={result["writes"]:8.1f}'
+            )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--database', type=Path, default=Path('fastapi.db'))
+    parser.add_argument('--duration', type=float, default=5)
+    parser.add_argument(
+        '--readers', type=int, default=2, help='процессов-читателей'
+    )
+    parser.add_argument(
+        '--writers', type=int, default=2, help='процессов-писателей'
+    )
+    main(parser.parse_args())
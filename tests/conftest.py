@@ -3,7 +3,7 @@ from pathlib import Path
 import pytest
 import pytest_asyncio
 from mixer.backend.sqlalchemy import Mixer as _mixer
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -48,6 +48,7 @@ BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 pytest_plugins = [
     'fixtures.user',
     'fixtures.data',
+    'fixtures.google',
 ]
 
 TEST_DB = BASE_DIR / 'test.db'
@@ -58,6 +59,7 @@ engine = create_async_engine(
 )
 TestingSessionLocal = sessionmaker(
     class_=AsyncSession, autocommit=False, autoflush=False, bind=engine,
+    expire_on_commit=False,
 )
 
 
@@ -75,6 +77,28 @@ async def init_db():
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest_asyncio.fixture(autouse=True)
+async def clear_cache():
+    from app.core.cache import charity_project_list_cache
+
+    await charity_project_list_cache.invalidate()
+
+
+@pytest.fixture
+def sql_statements():
+    """Список SQL-запросов, выполненных приложением во время теста."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, 'before_cursor_execute',
+                 before_cursor_execute)
+    yield statements
+    event.remove(engine.sync_engine, 'before_cursor_execute',
+                 before_cursor_execute)
+
+
 @pytest.fixture
 def mixer():
     mixer_engine = create_engine(f'sqlite:///{str(TEST_DB)}')
@@ -0,0 +1,300 @@
+import asyncio
+import json
+import re
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import jwt
+import pytest
+from aiogoogle.auth.creds import ServiceAccountCreds
+from aiogoogle.resource import GoogleAPI
+from aiohttp import web
+from conftest import TestingSessionLocal, app
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.core.config import settings
+from app.core.google_client import (
+    DISCOVERY_APIS, SCOPES, CachedAiogoogle, get_service)
+from app.services.reports import report_jobs
+
+DISCOVERY_DIR = Path(__file__).resolve().parent / 'google_discovery'
+ACCESS_TOKEN = 'fake-access-token'
+JWT_GRANT_TYPE = 'urn:ietf:params:oauth:grant-type:jwt-bearer'
+# Адресат JWT-утверждения сервисного аккаунта - всегда токен-эндпоинт
+# Google, даже если токен запрашивается по другому адресу.
+GOOGLE_TOKEN_AUDIENCE = 'https://oauth2.googleapis.com/token'
+CLIENT_EMAIL = 'reports@charity-test.iam.gserviceaccount.com'
+REPORT_READER_EMAIL = 'reader@example.com'
+PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+SCALAR_TYPES = {'string': str, 'integer': int, 'boolean': bool}
+
+
+class GoogleRequest(NamedTuple):
+    method: str
+    params: dict
+    json: Optional[dict]
+
+
+class GoogleError(Exception):
+    """Ответ об ошибке в формате Google API."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def check_value(value, schema: dict, schemas: dict, name: str) -> None:
+    """
+    Проверяет значение по схеме discovery-документа строже,
+    чем Aiogoogle: неизвестные поля объектов считаются ошибкой.
+    """
+    if '$ref' in schema:
+        schema = schemas[schema['$ref']]
+    kind = schema.get('type')
+    if value is None or kind == 'any':
+        return
+    if kind == 'object':
+        if not isinstance(value, dict):
+            raise GoogleError(400, f'{name}: ожидается объект')
+        properties = schema.get('properties', {})
+        unknown = value.keys() - properties.keys()
+        if unknown:
+            raise GoogleError(
+                400, f'{name}: неизвестные поля {sorted(unknown)}'
+            )
+        for key, item in value.items():
+            check_value(item, properties[key], schemas, f'{name}.{key}')
+    elif kind == 'array':
+        if not isinstance(value, list):
+            raise GoogleError(400, f'{name}: ожидается список')
+        for number, item in enumerate(value):
+            check_value(item, schema['items'], schemas, f'{name}[{number}]')
+    elif kind in SCALAR_TYPES:
+        if type(value) is not SCALAR_TYPES[kind]:
+            raise GoogleError(400, f'{name}: ожидается {kind}')
+        if 'enum' in schema and value not in schema['enum']:
+            raise GoogleError(400, f'{name}: недопустимое значение {value!r}')
+
+
+def iter_methods(resource: dict):
+    yield from resource.get('methods', {}).values()
+    for nested in resource.get('resources', {}).values():
+        yield from iter_methods(nested)
+
+
+def get_path_pattern(path: str):
+    """Регулярное выражение пути метода с параметрами вида {name}."""
+    parts = re.split(r'\{(\w+)\}', path)
+    return re.compile(''.join(
+        f'(?P<{part}>[^/]+)' if number % 2 else re.escape(part)
+        for number, part in enumerate(parts)
+    ) + '$')
+
+
+class ApiMethod(NamedTuple):
+    document: dict
+    spec: dict
+    pattern: re.Pattern
+
+
+class FakeGoogle:
+    """
+    Локальный сервер Google API на aiohttp.
+    Выдает токен сервисному аккаунту по JWT-утверждению (как
+    oauth2.googleapis.com/token) и отвечает на запросы методов
+    из discovery-документов tests/fixtures/google_discovery,
+    проверяя путь, параметры и тело запроса по документу.
+    Запросы выполняет настоящий клиент Aiogoogle.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.error: Optional[GoogleError] = None
+        self.documents = {}
+        self.methods = []
+        self.url = None
+
+    def start(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True
+        )
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.serve(), self.loop).result()
+        for api_name, api_version in DISCOVERY_APIS:
+            document = json.loads(
+                (DISCOVERY_DIR / f'{api_name}_{api_version}.json').read_text(
+                    encoding='utf-8'
+                )
+            )
+            document['rootUrl'] = self.url
+            self.documents[(api_name, api_version)] = document
+            self.methods.extend(
+                ApiMethod(
+                    document, spec,
+                    get_path_pattern(document['servicePath'] + spec['path']),
+                )
+                for spec in iter_methods(document)
+            )
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(
+            self.runner.cleanup(), self.loop
+        ).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+    async def serve(self) -> None:
+        server = web.Application()
+        server.router.add_post('/token', self.issue_token)
+        server.router.add_route('*', '/{path:.*}', self.call_method)
+        self.runner = web.AppRunner(server)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}/'
+
+    @property
+    def token_uri(self) -> str:
+        return f'{self.url}token'
+
+    async def issue_token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get('grant_type') != JWT_GRANT_TYPE:
+            return self.error_response(GoogleError(400, 'invalid_grant'))
+        try:
+            claims = jwt.decode(
+                form.get('assertion', ''),
+                PRIVATE_KEY.public_key(),
+                algorithms=['RS256'],
+                audience=GOOGLE_TOKEN_AUDIENCE,
+                issuer=CLIENT_EMAIL,
+            )
+        except jwt.InvalidTokenError as error:
+            return self.error_response(GoogleError(400, str(error)))
+        if set(claims.get('scope', '').split()) != set(SCOPES):
+            return self.error_response(GoogleError(400, 'invalid_scope'))
+        return web.json_response({
+            'access_token': ACCESS_TOKEN,
+            'expires_in': 3600,
+            'token_type': 'Bearer',
+        })
+
+    async def call_method(self, request: web.Request) -> web.Response:
+        try:
+            if request.headers.get('Authorization') != (
+                f'Bearer {ACCESS_TOKEN}'
+            ):
+                raise GoogleError(401, 'Request had invalid credentials.')
+            method, path_params = self.find_method(request)
+            body = await request.json() if request.can_read_body else None
+            params = {**path_params, **self.check_query(method, request)}
+            if 'request' in method.spec:
+                check_value(
+                    body, method.spec['request'],
+                    method.document['schemas'], method.spec['id'],
+                )
+            if self.error is not None:
+                raise self.error
+        except GoogleError as error:
+            return self.error_response(error)
+        self.requests.append(GoogleRequest(method.spec['id'], params, body))
+        return web.json_response(self.respond(method.spec['id']))
+
+    def find_method(self, request: web.Request):
+        path = request.path.lstrip('/')
+        for method in self.methods:
+            match = method.pattern.match(path)
+            if match and method.spec['httpMethod'] == request.method:
+                return method, match.groupdict()
+        raise GoogleError(404, f'Метод {request.method} {path} не найден')
+
+    @staticmethod
+    def check_query(method: ApiMethod, request: web.Request) -> dict:
+        parameters = {
+            **method.document.get('parameters', {}),
+            **method.spec.get('parameters', {}),
+        }
+        unknown = [
+            name for name in request.query
+            if parameters.get(name, {}).get('location') != 'query'
+        ]
+        if unknown:
+            raise GoogleError(400, f'Неизвестные параметры: {unknown}')
+        return dict(request.query)
+
+    def respond(self, method_id: str) -> dict:
+        if method_id == 'sheets.spreadsheets.create':
+            number = len(self.get_requests(method_id))
+            return {'spreadsheetId': f'sheet-{number}'}
+        if method_id == 'drive.permissions.create':
+            return {'id': 'permission', 'kind': 'drive#permission'}
+        return {}
+
+    @staticmethod
+    def error_response(error: GoogleError) -> web.Response:
+        return web.json_response(
+            {'error': {'code': error.code, 'message': error.message}},
+            status=error.code,
+        )
+
+    def get_requests(self, method):
+        return [
+            request for request in self.requests if request.method == method
+        ]
+
+    def make_client(self) -> CachedAiogoogle:
+        """
+        Клиент Google API приложения, настроенный на этот сервер:
+        сервисный аккаунт получает токен у сервера, а discovery-документы
+        уже загружены и проверяют параметры вызовов.
+        """
+        creds = ServiceAccountCreds(
+            scopes=SCOPES,
+            type='service_account',
+            project_id='charity-test',
+            private_key_id='test-key',
+            private_key=PRIVATE_KEY.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ).decode(),
+            client_email=CLIENT_EMAIL,
+            client_id='1',
+            token_uri=self.token_uri,
+        )
+        client = CachedAiogoogle(service_account_creds=creds)
+        for key, document in self.documents.items():
+            client.discovery_documents[key] = GoogleAPI(
+                document, validate=True
+            )
+        return client
+
+
+@pytest.fixture
+def fake_google(superuser_client, monkeypatch):
+    google = FakeGoogle()
+    google.start()
+    client = google.make_client()
+
+    @asynccontextmanager
+    async def open_fake_service():
+        async with client:
+            yield client
+
+    async def get_fake_service():
+        async with open_fake_service() as service:
+            yield service
+
+    app.dependency_overrides[get_service] = get_fake_service
+    monkeypatch.setattr(report_jobs, 'service_factory', open_fake_service)
+    monkeypatch.setattr(report_jobs, 'session_factory', TestingSessionLocal)
+    monkeypatch.setattr(settings, 'email', REPORT_READER_EMAIL)
+    yield google
+    google.stop()
@@ -4,6 +4,7 @@ from conftest import (
 )
 from fastapi.testclient import TestClient
 
+from app.core.user import verified_tokens
 from app.models.user import User
 
 superuser = User(
@@ -53,3 +54,24 @@ def superuser_client():
     app.dependency_overrides[current_superuser] = lambda: superuser
     with TestClient(app) as client:
         yield client
+
+
+@pytest.fixture
+def superuser_donor():
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    app.dependency_overrides[current_superuser] = lambda: superuser
+    app.dependency_overrides[current_user] = lambda: superuser
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_client():
+    """Клиент без подмены пользователя: аутентификация по настоящим JWT."""
+    app.dependency_overrides = {}
+    app.dependency_overrides[get_async_session] = override_db
+    verified_tokens.tokens.clear()
+    with TestClient(app) as client:
+        yield client
+    verified_tokens.tokens.clear()
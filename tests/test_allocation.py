@@ -0,0 +1,177 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import TestingSessionLocal
+from app.core.config import settings
+from app.models import Donation
+from app.services import allocation
+from app.services.allocation import AllocationWorker, allocation_worker
+
+
+@pytest.fixture
+def background_allocation(monkeypatch):
+    monkeypatch.setattr(settings, 'allocation_in_background', True)
+    monkeypatch.setattr(
+        allocation_worker, 'session_factory', TestingSessionLocal
+    )
+
+
+def wait_for_allocation(client, url):
+    for _ in range(100):
+        status = client.get(url).json()['status']
+        if status == 'allocated':
+            return
+        time.sleep(0.05)
+    raise AssertionError(f'Распределение не завершилось: {url}')
+
+
+def test_donation_allocated_in_background(background_allocation,
+                                          charity_project, user_client):
+    response = user_client.post('/donation/', json={'full_amount': 500})
+    assert response.status_code == 200, (
+        'В режиме фонового распределения пожертвование должно создаваться '
+        'со статус-кодом 200.'
+    )
+    wait_for_allocation(
+        user_client, f'/allocation/donation/{response.json()["id"]}'
+    )
+    assert charity_project.invested_amount == 500, (
+        'После фонового распределения пожертвование должно быть внесено '
+        'в открытый проект.'
+    )
+
+
+def test_project_allocated_in_background(background_allocation,
+                                         superuser_client, donation):
+    response = superuser_client.post(
+        '/charity_project/',
+        json={
+            'name': 'Мертвый Бассейн',
+            'description': 'Deadpool inside',
+            'full_amount': 1000,
+        },
+    )
+    assert response.status_code == 200
+    project_id = response.json()['id']
+    wait_for_allocation(
+        superuser_client, f'/allocation/charity_project/{project_id}'
+    )
+    data = superuser_client.get('/charity_project/').json()
+    assert data[0]['invested_amount'] == 100, (
+        'После фонового распределения в новый проект должны быть внесены '
+        'свободные пожертвования.'
+    )
+    assert donation.fully_invested, (
+        'Полностью распределенное пожертвование должно быть закрыто.'
+    )
+    queue_info = superuser_client.get('/allocation/').json()
+    assert queue_info == {'background': True, 'pending': 0}
+
+
+def test_unallocated_money_recovered_on_startup(background_allocation,
+                                                charity_project, donation,
+                                                user_client):
+    assert charity_project.invested_amount == 100, (
+        'При запуске фонового распределения свободные пожертвования должны '
+        'быть внесены в открытые проекты.'
+    )
+    assert donation.fully_invested
+
+
+def test_allocation_queue_info_sync_mode(superuser_client):
+    response = superuser_client.get('/allocation/')
+    assert response.json() == {'background': False, 'pending': 0}
+
+
+def test_allocation_status_not_found(superuser_donor):
+    assert superuser_donor.get(
+        '/allocation/donation/100'
+    ).status_code == 404
+    assert superuser_donor.get(
+        '/allocation/charity_project/100'
+    ).status_code == 404
+
+
+def test_allocation_status_other_user_donation(test_client, donation):
+    response = test_client.get(f'/allocation/donation/{donation.id}')
+    assert response.status_code == 403, (
+        'Статус чужого пожертвования должен быть недоступен.'
+    )
+
+
+def test_allocation_status_superuser_any_donation(superuser_donor, donation):
+    response = superuser_donor.get(f'/allocation/donation/{donation.id}')
+    assert response.status_code == 200
+
+
+def test_allocation_status_from_data(user_client, charity_project, donation):
+    response = user_client.get(f'/allocation/donation/{donation.id}')
+    assert response.json() == {'status': 'pending'}, (
+        'Открытое пожертвование при открытых проектах еще ждет '
+        'распределения, даже если его нет в очереди этого процесса.'
+    )
+
+
+def test_allocation_status_no_open_projects(user_client, donation):
+    response = user_client.get(f'/allocation/donation/{donation.id}')
+    assert response.json() == {'status': 'allocated'}
+
+
+@pytest.fixture
+def failing_worker(monkeypatch, charity_project, donation, another_donation):
+    """
+    Обработчик очереди, для которого распределение
+    первого пожертвования всегда завершается ошибкой.
+    """
+    worker = AllocationWorker()
+    worker.session_factory = TestingSessionLocal
+    allocate_one = worker.allocate_one
+
+    async def failing_allocate_one(table_name, obj_id, *args):
+        if obj_id == donation.id:
+            raise RuntimeError('database is locked')
+        return await allocate_one(table_name, obj_id, *args)
+
+    monkeypatch.setattr(worker, 'allocate_one', failing_allocate_one)
+    monkeypatch.setattr(allocation, 'RETRY_DELAY', 0)
+    return worker
+
+
+async def test_failed_item_does_not_drop_batch(failing_worker, donation,
+                                               another_donation):
+    failed_key = (Donation.__tablename__, donation.id)
+    failed = await failing_worker.process_batch([
+        failed_key, (Donation.__tablename__, another_donation.id)
+    ])
+    assert failed == {failed_key}, (
+        'Ошибка при распределении одного объекта не должна '
+        'отменять распределение остальных объектов пачки.'
+    )
+    async with TestingSessionLocal() as session:
+        allocated = await session.get(Donation, another_donation.id)
+        assert allocated.fully_invested
+
+
+async def test_failed_item_retried_and_marked(monkeypatch, failing_worker,
+                                              donation, another_donation):
+    async def no_recover():
+        pass
+
+    monkeypatch.setattr(failing_worker, 'recover', no_recover)
+    await failing_worker.start()
+    failing_worker.enqueue(donation)
+    failing_worker.enqueue(another_donation)
+    await asyncio.wait_for(failing_worker.stop(), timeout=5)
+    failed_key = (Donation.__tablename__, donation.id)
+    assert failing_worker.failed == {failed_key}, (
+        'Объект, который не удалось распределить после всех попыток, '
+        'должен помечаться как failed.'
+    )
+    assert not failing_worker.pending
+    async with TestingSessionLocal() as session:
+        db_donation = await session.get(Donation, donation.id)
+        assert await failing_worker.get_status(
+            db_donation, session
+        ) == 'failed'
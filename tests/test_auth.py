@@ -1,3 +1,26 @@
+import sqlite3
+import time
+
+from conftest import TEST_DB
+
+from app.core.user import AuthenticatedUser, VerifiedTokenCache
+
+PASSWORD = 'chimichangas4life'
+
+
+def login(client, email):
+    client.post('/auth/register', json={'email': email, 'password': PASSWORD})
+    response = client.post(
+        '/auth/jwt/login', data={'username': email, 'password': PASSWORD}
+    )
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+def make_superuser(email):
+    with sqlite3.connect(TEST_DB) as connection:
+        connection.execute(
+            'UPDATE user SET is_superuser = 1 WHERE email = ?', (email,)
+        )
 
 
 def test_register(test_client):
@@ -45,3 +68,81 @@ def test_register_invalid_pass(user_client):
         'При некорректной регистрации пользователя тело ответа API отличается '
         'от ожидаемого.'
     )
+
+
+def test_jwt_user_cached(auth_client, sql_statements):
+    headers = login(auth_client, 'dead@pool.com')
+    response = auth_client.post(
+        '/donation/', json={'full_amount': 10}, headers=headers
+    )
+    assert response.status_code == 200
+    sql_statements.clear()
+    response = auth_client.post(
+        '/donation/', json={'full_amount': 20}, headers=headers
+    )
+    assert response.status_code == 200
+    assert not [
+        statement for statement in sql_statements
+        if 'FROM user' in statement
+    ], (
+        'Повторный запрос с тем же токеном не должен читать '
+        'пользователя из БД.'
+    )
+    my_donations = auth_client.get('/donation/my', headers=headers).json()
+    assert [donation['full_amount'] for donation in my_donations] == [10, 20]
+
+
+def test_jwt_invalid_token(auth_client):
+    response = auth_client.post(
+        '/donation/', json={'full_amount': 10},
+        headers={'Authorization': 'Bearer invalid'},
+    )
+    assert response.status_code == 401
+    assert auth_client.post(
+        '/donation/', json={'full_amount': 10}
+    ).status_code == 401
+
+
+def test_jwt_superuser_required(auth_client):
+    headers = login(auth_client, 'dead@pool.com')
+    assert auth_client.get('/donation/', headers=headers).status_code == 403, (
+        'Пользователю без прав суперпользователя должен возвращаться 403.'
+    )
+    admin_headers = login(auth_client, 'admin@pool.com')
+    make_superuser('admin@pool.com')
+    assert auth_client.get(
+        '/donation/', headers=admin_headers
+    ).status_code == 200
+
+
+def test_jwt_cache_invalidated_on_update(auth_client):
+    headers = login(auth_client, 'dead@pool.com')
+    admin_headers = login(auth_client, 'admin@pool.com')
+    make_superuser('admin@pool.com')
+    user_id = auth_client.get('/users/me', headers=headers).json()['id']
+    assert auth_client.post(
+        '/donation/', json={'full_amount': 10}, headers=headers
+    ).status_code == 200
+    response = auth_client.patch(
+        f'/users/{user_id}', json={'is_active': False}, headers=admin_headers
+    )
+    assert response.status_code == 200
+    assert auth_client.post(
+        '/donation/', json={'full_amount': 10}, headers=headers
+    ).status_code == 401, (
+        'После изменения пользователя его токены должны '
+        'проверяться заново.'
+    )
+
+
+def test_verified_token_expires():
+    cache = VerifiedTokenCache(maxsize=10, ttl=60)
+    user = AuthenticatedUser(id=1, is_active=True, is_superuser=False)
+    cache.set('expired', user, time.time() - 1)
+    cache.set('valid', user, time.time() + 60)
+    assert cache.get('expired') is None, (
+        'Токен с истекшим сроком не должен браться из кэша.'
+    )
+    assert cache.get('valid') == user
+    cache.invalidate_user(1)
+    assert cache.get('valid') is None
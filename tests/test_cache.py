@@ -0,0 +1,68 @@
+from sqlalchemy import create_engine, text
+
+from conftest import TEST_DB
+
+
+def update_in_db_directly(statement):
+    engine = create_engine(f'sqlite:///{str(TEST_DB)}')
+    with engine.begin() as connection:
+        connection.execute(text(statement))
+    engine.dispose()
+
+
+def test_charity_projects_etag(test_client, charity_project):
+    response = test_client.get('/charity_project/')
+    etag = response.headers.get('ETag')
+    assert etag, 'Список проектов должен возвращаться с заголовком `ETag`.'
+    response = test_client.get(
+        '/charity_project/', headers={'If-None-Match': etag}
+    )
+    assert response.status_code == 304, (
+        'При совпадении `If-None-Match` с актуальным `ETag` должен '
+        'возвращаться статус-код 304.'
+    )
+    assert response.content == b''
+
+
+def test_charity_projects_cache_invalidated_on_write(superuser_client,
+                                                     charity_project):
+    first = superuser_client.get('/charity_project/')
+    update_in_db_directly(
+        "UPDATE charityproject SET description = 'changed outside'"
+    )
+    assert superuser_client.get('/charity_project/').json() == first.json(), (
+        'Повторный запрос списка проектов должен отдаваться из кэша.'
+    )
+    superuser_client.patch('/charity_project/1', json={'name': 'chimi'})
+    data = superuser_client.get('/charity_project/').json()
+    assert data[0]['name'] == 'chimi', (
+        'После изменения проекта кэш списка проектов должен сбрасываться.'
+    )
+    assert superuser_client.get(
+        '/charity_project/', headers={'If-None-Match': first.headers['ETag']}
+    ).status_code == 200, 'После изменения проекта ETag должен меняться.'
+
+
+def test_charity_projects_cache_invalidated_by_donation(user_client,
+                                                        charity_project):
+    user_client.get('/charity_project/')
+    user_client.post('/donation/', json={'full_amount': 500})
+    data = user_client.get('/charity_project/').json()
+    assert data[0]['invested_amount'] == 500, (
+        'Если пожертвование было внесено в проекты, кэш списка проектов '
+        'должен сбрасываться.'
+    )
+
+
+def test_charity_projects_cache_kept_without_allocation(
+        user_client, small_fully_charity_project
+):
+    first = user_client.get('/charity_project/').json()
+    update_in_db_directly(
+        "UPDATE charityproject SET description = 'changed outside'"
+    )
+    user_client.post('/donation/', json={'full_amount': 500})
+    assert user_client.get('/charity_project/').json() == first, (
+        'Если пожертвование не было внесено ни в один проект, кэш списка '
+        'проектов сбрасываться не должен.'
+    )
@@ -467,6 +467,32 @@ def test_update_charity_project_same_name(superuser_client, charity_project,
     }
 
 
+def test_update_charity_project_keep_own_name(superuser_client,
+                                              charity_project):
+    response = superuser_client.patch(
+        '/charity_project/1',
+        json={'name': 'chimichangas4life', 'full_amount': 2000000},
+    )
+    assert response.status_code == 200, (
+        'При редактировании проекта можно оставить его текущее имя.'
+    )
+    assert response.json()['full_amount'] == 2000000
+
+
+def test_update_charity_project_same_name_not_changed(
+        superuser_client, charity_project, charity_project_nunchaku
+):
+    superuser_client.patch(
+        '/charity_project/1',
+        json={'name': 'nunchaku', 'full_amount': 2000000},
+    )
+    data = superuser_client.get('/charity_project/').json()
+    assert data[0]['name'] == 'chimichangas4life'
+    assert data[0]['full_amount'] == 1000000, (
+        'При попытке задать проекту занятое имя проект не должен изменяться.'
+    )
+
+
 @pytest.mark.parametrize('full_amount', [
     0,
     5,
@@ -696,3 +722,138 @@ def test_get_all_charity_project_not_auth_user(test_client, charity_project,
             'name': 'nunchaku'
         }
     ]
+
+
+def test_get_charity_projects_paginated(test_client, charity_project,
+                                        charity_project_nunchaku,
+                                        small_fully_charity_project):
+    response = test_client.get('/charity_project/', params={'limit': 2})
+    assert response.status_code == 200
+    assert [project['id'] for project in response.json()] == [1, 2], (
+        'При запросе с параметром `limit` должна возвращаться страница '
+        'указанного размера в порядке возрастания id.'
+    )
+    next_cursor = response.headers.get('X-Next-Cursor')
+    assert next_cursor == '2', (
+        'Если страница заполнена целиком, в заголовке `X-Next-Cursor` '
+        'должен передаваться id последнего проекта страницы.'
+    )
+    response = test_client.get(
+        '/charity_project/', params={'limit': 2, 'after': next_cursor}
+    )
+    assert [project['id'] for project in response.json()] == [3], (
+        'При запросе с параметром `after` должны возвращаться проекты '
+        'с id больше переданного курсора.'
+    )
+    assert 'X-Next-Cursor' not in response.headers, (
+        'На последней странице заголовок `X-Next-Cursor` передаваться '
+        'не должен.'
+    )
+
+
+@pytest.mark.parametrize('params', [
+    {'limit': 0},
+    {'limit': 100000},
+    {'after': -1},
+])
+def test_get_charity_projects_invalid_pagination(test_client, params):
+    response = test_client.get('/charity_project/', params=params)
+    assert response.status_code == 422
+
+
+IMPORTED_PROJECTS = [
+    {'name': 'first', 'description': 'first shelter', 'full_amount': 50},
+    {'name': 'second', 'description': 'second shelter', 'full_amount': 1000},
+    {'name': 'third', 'description': 'third shelter', 'full_amount': 5000},
+]
+
+
+def test_import_charity_projects(superuser_client, donation,
+                                 another_donation, sql_statements):
+    response = superuser_client.post(
+        '/charity_project/import', json=IMPORTED_PROJECTS
+    )
+    assert response.status_code == 200, (
+        'При импорте проектов должен возвращаться статус-код 200.'
+    )
+    data = response.json()
+    assert [project['id'] for project in data] == [1, 2, 3]
+    assert [project['invested_amount'] for project in data] == [
+        50, 1000, 1050
+    ], (
+        'Нераспределенные пожертвования должны вноситься в импортированные '
+        'проекты в порядке их следования.'
+    )
+    assert [project['fully_invested'] for project in data] == [
+        True, True, False
+    ]
+    assert len([
+        statement for statement in sql_statements
+        if statement.startswith('INSERT INTO charityproject')
+    ]) == 1, 'Импортированные проекты должны записываться одним INSERT.'
+    donations = superuser_client.get('/donation/').json()
+    assert all(donation['fully_invested'] for donation in donations)
+
+
+def test_import_charity_projects_csv(superuser_client):
+    content = (
+        'name,description,full_amount\n'
+        'first,first shelter,50\n'
+        '"second, with comma",second shelter,1000\n'
+    )
+    response = superuser_client.post(
+        '/charity_project/import/csv',
+        files={'file': ('projects.csv', content.encode(), 'text/csv')},
+    )
+    assert response.status_code == 200, (
+        'При импорте проектов из CSV должен возвращаться статус-код 200.'
+    )
+    assert [project['name'] for project in response.json()] == [
+        'first', 'second, with comma'
+    ]
+    assert len(superuser_client.get('/charity_project/').json()) == 2
+
+
+@pytest.mark.parametrize('content', [
+    'name,description,full_amount\nfirst,first shelter,-5\n',
+    'name,description\nfirst,first shelter\n',
+    'name,description,full_amount\n',
+])
+def test_import_charity_projects_csv_invalid(superuser_client, content):
+    response = superuser_client.post(
+        '/charity_project/import/csv',
+        files={'file': ('projects.csv', content.encode(), 'text/csv')},
+    )
+    assert response.status_code == 422, (
+        'Некорректный CSV при импорте проектов должен отклоняться '
+        'со статус-кодом 422.'
+    )
+
+
+@pytest.mark.parametrize('projects', [
+    IMPORTED_PROJECTS + [{
+        'name': 'chimichangas4life', 'description': 'taken', 'full_amount': 1,
+    }],
+    IMPORTED_PROJECTS + IMPORTED_PROJECTS[:1],
+])
+def test_import_charity_projects_duplicate_names(superuser_client,
+                                                 charity_project, projects,
+                                                 sql_statements):
+    response = superuser_client.post(
+        '/charity_project/import', json=projects
+    )
+    assert response.status_code == 400, (
+        'Импорт проектов с занятыми или повторяющимися именами '
+        'должен отклоняться.'
+    )
+    assert [statement.split()[0] for statement in sql_statements] == [
+        'SELECT'
+    ], 'Уникальность имен при импорте должна проверяться одним запросом.'
+    assert len(superuser_client.get('/charity_project/').json()) == 1
+
+
+def test_import_charity_projects_usual_user(user_client):
+    response = user_client.post(
+        '/charity_project/import', json=IMPORTED_PROJECTS
+    )
+    assert response.status_code == 401
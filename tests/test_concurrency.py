@@ -0,0 +1,147 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from conftest import TestingSessionLocal
+from app.api.endpoints import charity_project as charity_project_endpoints
+from app.crud.donation import donation_crud
+from app.models import CharityProject, Donation
+from app.schemas.donation import DonationCreate
+from app.services.investments import make_investments
+
+PROJECTS_COUNT = 10
+PROJECT_AMOUNT = 100
+DONATIONS_COUNT = 40
+DONATION_AMOUNT = 30
+
+
+async def create_donation(full_amount):
+    async with TestingSessionLocal() as session:
+        donation = await donation_crud.create_db_object(
+            DonationCreate(full_amount=full_amount)
+        )
+        donation = await make_investments(donation, session)
+        await donation_crud.commit_creation(donation, session)
+
+
+async def run_donations(concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(full_amount):
+        async with semaphore:
+            await create_donation(full_amount)
+
+    await asyncio.gather(
+        *(limited(DONATION_AMOUNT) for _ in range(DONATIONS_COUNT))
+    )
+
+
+def create_projects(mixer):
+    for number in range(PROJECTS_COUNT):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}',
+            description='Project for concurrent allocation',
+            full_amount=PROJECT_AMOUNT,
+        )
+
+
+async def get_totals():
+    async with TestingSessionLocal() as session:
+        projects = await session.execute(
+            select(
+                func.sum(CharityProject.invested_amount),
+                func.sum(CharityProject.full_amount),
+            )
+        )
+        donations = await session.execute(
+            select(
+                func.sum(Donation.invested_amount),
+                func.count(Donation.id),
+            )
+        )
+        return projects.one(), donations.one()
+
+
+async def test_concurrent_donations_keep_totals(mixer):
+    create_projects(mixer)
+    await run_donations(concurrency=DONATIONS_COUNT)
+    (projects_invested, projects_full), (donations_invested, count) = (
+        await get_totals()
+    )
+    assert count == DONATIONS_COUNT, (
+        'При параллельном создании пожертвований все они должны быть '
+        'сохранены.'
+    )
+    assert projects_invested == projects_full, (
+        'Суммы пожертвований хватает на все проекты: при параллельном '
+        'распределении все проекты должны быть полностью проинвестированы.'
+    )
+    assert donations_invested == projects_invested, (
+        'При параллельном распределении сумма, списанная с пожертвований, '
+        'должна совпадать с суммой, внесенной в проекты.'
+    )
+
+
+def donate_after_read(monkeypatch, check_name, times=1):
+    """
+    Подменяет проверку в эндпоинте проектов так, что после чтения
+    проекта, но до записи, параллельное пожертвование вносит в него
+    DONATION_AMOUNT первые times раз.
+    """
+    check = getattr(charity_project_endpoints, check_name)
+    calls = iter(range(times))
+
+    async def check_after_donation(charity_project, *args):
+        if next(calls, None) is not None:
+            await create_donation(DONATION_AMOUNT)
+        return await check(charity_project, *args)
+
+    monkeypatch.setattr(
+        charity_project_endpoints, check_name, check_after_donation
+    )
+
+
+def test_patch_project_changed_by_donation(monkeypatch, superuser_client,
+                                           charity_project):
+    donate_after_read(monkeypatch, 'check_project_is_open')
+    response = superuser_client.patch(
+        f'/charity_project/{charity_project.id}',
+        json={'full_amount': DONATION_AMOUNT},
+    )
+    assert response.status_code == 200, (
+        'Если проект изменился между чтением и записью, изменение '
+        'должно быть выполнено заново со свежими данными.'
+    )
+    data = response.json()
+    assert data['invested_amount'] == DONATION_AMOUNT
+    assert data['fully_invested'], (
+        'Проверки при повторе должны учитывать параллельное пожертвование.'
+    )
+
+
+def test_delete_project_changed_by_donation(monkeypatch, superuser_client,
+                                            charity_project):
+    donate_after_read(monkeypatch, 'check_project_has_no_donations')
+    response = superuser_client.delete(
+        f'/charity_project/{charity_project.id}'
+    )
+    assert response.status_code == 400, (
+        'Проект, в который параллельно внесли средства, '
+        'не должен удаляться.'
+    )
+
+
+def test_project_changed_on_every_attempt(monkeypatch, superuser_client,
+                                          charity_project):
+    donate_after_read(
+        monkeypatch, 'check_project_is_open',
+        times=charity_project_endpoints.STALE_PROJECT_ATTEMPTS,
+    )
+    response = superuser_client.patch(
+        f'/charity_project/{charity_project.id}', json={'name': 'new name'}
+    )
+    assert response.status_code == 409, (
+        'Если проект меняется параллельно при каждой попытке, '
+        'должен возвращаться статус-код 409.'
+    )
@@ -56,3 +56,71 @@ def test_check_db_url():
                 'Укажите значение по умолчанию для подключения базы данных '
                 'sqlite '
             )
+
+
+def test_allocation_indexes():
+    from app.core.base import Base
+
+    for table_name in ('charityproject', 'donation'):
+        indexes = {
+            index.name: index
+            for index in Base.metadata.tables[table_name].indexes
+        }
+        open_index = indexes.get(f'ix_{table_name}_open')
+        assert open_index is not None, (
+            f'Для таблицы `{table_name}` не обнаружен индекс по открытым '
+            'объектам.'
+        )
+        assert [column.name for column in open_index.columns] == [
+            'fully_invested', 'create_date', 'id'
+        ]
+    assert 'ix_donation_user_id_create_date' in {
+        index.name for index in Base.metadata.tables['donation'].indexes
+    }, 'Не обнаружен индекс по `donation(user_id, create_date)`.'
+
+
+async def test_sqlite_connection_pragmas(tmp_path):
+    from sqlalchemy import text
+
+    from app.core.db import make_engine
+
+    db_engine = make_engine(f'sqlite+aiosqlite:///{tmp_path / "wal.db"}')
+    async with db_engine.connect() as connection:
+        pragmas = {
+            pragma: (
+                await connection.execute(text(f'PRAGMA {pragma}'))
+            ).scalar()
+            for pragma in (
+                'journal_mode', 'synchronous', 'busy_timeout', 'mmap_size'
+            )
+        }
+    await db_engine.dispose()
+    assert pragmas == {
+        'journal_mode': 'wal',
+        'synchronous': 1,
+        'busy_timeout': 5000,
+        'mmap_size': 268435456,
+    }, (
+        'Соединения с SQLite должны работать в режиме WAL '
+        'с настройками из `Settings`.'
+    )
+
+
+async def test_sqlite_connections_reused(tmp_path):
+    from sqlalchemy import event, text
+
+    from app.core.db import make_engine
+
+    db_engine = make_engine(f'sqlite+aiosqlite:///{tmp_path / "pool.db"}')
+    connects = []
+    event.listen(
+        db_engine.sync_engine, 'connect', lambda *args: connects.append(1)
+    )
+    for _ in range(3):
+        async with db_engine.connect() as connection:
+            await connection.execute(text('SELECT 1'))
+    await db_engine.dispose()
+    assert len(connects) == 1, (
+        'Соединения с файлом SQLite должны браться из пула, '
+        'а не открываться и настраиваться на каждый запрос.'
+    )
@@ -1,6 +1,9 @@
 from datetime import datetime
 
 import pytest
+from sqlalchemy import create_engine
+
+from conftest import TEST_DB, Base
 
 
 @pytest.mark.parametrize('json, keys, expected_data', [
@@ -197,3 +200,107 @@ def test_create_donation_check_create_date(user_client):
         'При создании двух пожертвований с паузой (в 1 секунду, например) у '
         'них должны быть разные `create_date`'
     )
+
+
+def test_get_all_donations_paginated(superuser_client, donation,
+                                     another_donation):
+    response = superuser_client.get('/donation/', params={'limit': 1})
+    assert [item['id'] for item in response.json()] == [1]
+    assert response.headers['X-Next-Cursor'] == '1', (
+        'Если страница пожертвований заполнена целиком, в заголовке '
+        '`X-Next-Cursor` должен передаваться id последнего пожертвования.'
+    )
+    response = superuser_client.get(
+        '/donation/', params={'limit': 1, 'after': 1}
+    )
+    assert [item['id'] for item in response.json()] == [2]
+
+
+BATCH_AMOUNTS = [50, 120, 300, 80, 2000]
+COMPARED_FIELDS = ('id', 'full_amount', 'invested_amount', 'fully_invested')
+
+
+def create_projects_for_batch(mixer):
+    for number, (full_amount, invested_amount) in enumerate(
+        [(100, 0), (250, 50), (1000, 0)]
+    ):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {number}',
+            description='batch',
+            full_amount=full_amount,
+            invested_amount=invested_amount,
+            fully_invested=False,
+            close_date=None,
+            create_date=datetime(2010, 10, 10 + number),
+        )
+
+
+def get_state(client):
+    donations = client.get('/donation/').json()
+    projects = client.get('/charity_project/').json()
+    return (
+        [{field: obj.get(field) for field in COMPARED_FIELDS}
+         for obj in donations],
+        [{field: obj.get(field) for field in COMPARED_FIELDS}
+         for obj in projects],
+        [obj.get('close_date') is None for obj in donations + projects],
+    )
+
+
+def test_create_donations_batch_matches_sequential(superuser_donor, mixer):
+    create_projects_for_batch(mixer)
+    response = superuser_donor.post('/donation/batch', json=[
+        {'full_amount': full_amount} for full_amount in BATCH_AMOUNTS
+    ])
+    assert response.status_code == 200, (
+        'При создании пачки пожертвований должен возвращаться '
+        'статус-код 200.'
+    )
+    assert [donation['id'] for donation in response.json()] == [
+        1, 2, 3, 4, 5
+    ]
+    batch_state = get_state(superuser_donor)
+
+    engine = create_engine(f'sqlite:///{str(TEST_DB)}')
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    create_projects_for_batch(mixer)
+    for full_amount in BATCH_AMOUNTS:
+        superuser_donor.post('/donation/', json={'full_amount': full_amount})
+    assert batch_state == get_state(superuser_donor), (
+        'Пачка пожертвований должна распределяться так же, как те же '
+        'пожертвования, созданные по очереди.'
+    )
+
+
+def test_create_donations_batch_single_insert(user_client, charity_project,
+                                              sql_statements):
+    response = user_client.post('/donation/batch', json=[
+        {'full_amount': 100, 'comment': 'first'},
+        {'full_amount': 200},
+    ])
+    data = response.json()
+    assert [donation['id'] for donation in data] == [1, 2]
+    assert data[0]['comment'] == 'first'
+    assert 'invested_amount' not in data[0]
+    inserts = [
+        statement for statement in sql_statements
+        if statement.startswith('INSERT INTO donation')
+    ]
+    assert len(inserts) == 1, (
+        'Пачка пожертвований должна записываться одним INSERT.'
+    )
+
+
+@pytest.mark.parametrize('json', [
+    [],
+    [{'full_amount': 100}, {'full_amount': -1}],
+    {'full_amount': 100},
+])
+def test_create_donations_batch_invalid(user_client, json):
+    response = user_client.post('/donation/batch', json=json)
+    assert response.status_code == 422, (
+        'Пачка должна содержать хотя бы одно корректное пожертвование.'
+    )
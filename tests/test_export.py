@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+
+import openpyxl
+import pytest
+
+
+def test_export_donations_ndjson(superuser_client, donation,
+                                 another_donation):
+    response = superuser_client.get('/export/donations')
+    assert response.status_code == 200, (
+        'При выгрузке пожертвований должен возвращаться статус-код 200.'
+    )
+    assert response.headers['content-type'].startswith(
+        'application/x-ndjson'
+    )
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row['id'] for row in rows] == [1, 2], (
+        'Выгрузка в формате NDJSON должна содержать по одной строке на '
+        'пожертвование в порядке возрастания id.'
+    )
+    assert rows[0] == {
+        'id': 1,
+        'full_amount': 100,
+        'comment': 'To you for chimichangas',
+        'user_id': 2,
+        'invested_amount': 0,
+        'fully_invested': False,
+        'create_date': '2011-11-11T00:00:00',
+        'close_date': None,
+    }
+
+
+def test_export_charity_projects_csv(superuser_client, charity_project,
+                                     small_fully_charity_project):
+    response = superuser_client.get(
+        '/export/charity_projects', params={'format': 'csv'}
+    )
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row['name'] for row in rows] == [
+        'chimichangas4life', '1M$ for ur project'
+    ], 'Выгрузка в формате CSV должна содержать заголовок и все проекты.'
+
+
+@pytest.mark.parametrize('params, expected_ids', [
+    ({'fully_invested': True}, [2]),
+    ({'fully_invested': False}, [1]),
+    ({'date_from': '2010-10-10T00:00:00'}, [1, 2]),
+    ({'date_to': '2010-10-10T00:00:00'}, []),
+])
+def test_export_filters(superuser_client, charity_project,
+                        small_fully_charity_project, params, expected_ids):
+    response = superuser_client.get(
+        '/export/charity_projects', params=params
+    )
+    ids = [json.loads(line)['id'] for line in response.text.splitlines()]
+    assert ids == expected_ids, (
+        'Выгрузка должна учитывать фильтры по дате создания и статусу.'
+    )
+
+
+def test_export_usual_user(user_client):
+    response = user_client.get('/export/donations')
+    assert response.status_code == 401, (
+        'Выгрузка пожертвований должна быть доступна только суперюзерам.'
+    )
+
+
+def test_export_report_csv(superuser_client, closed_charity_project,
+                           charity_project_nunchaku):
+    response = superuser_client.get('/export/report')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ['name', 'period', 'description'],
+        ['chimichangas4life', '1 day, 0:00:00',
+         'Huge fan of chimichangas. Wanna buy a lot'],
+    ], (
+        'Локальный отчет должен содержать те же закрытые проекты, '
+        'что и google-отчет.'
+    )
+
+
+def test_export_report_xlsx(superuser_client, closed_charity_project):
+    response = superuser_client.get(
+        '/export/report', params={'format': 'xlsx'}
+    )
+    assert response.status_code == 200
+    workbook = openpyxl.load_workbook(io.BytesIO(response.content))
+    assert list(workbook.active.values) == [
+        ('name', 'period', 'description'),
+        ('chimichangas4life', '1 day, 0:00:00',
+         'Huge fan of chimichangas. Wanna buy a lot'),
+    ], 'Отчет в формате XLSX должен содержать заголовок и проекты.'
+
+
+def test_export_donations_parquet(superuser_client, donation,
+                                  another_donation):
+    parquet = pytest.importorskip('pyarrow.parquet')
+    response = superuser_client.get(
+        '/export/donations', params={'format': 'parquet'}
+    )
+    assert response.status_code == 200
+    table = parquet.read_table(io.BytesIO(response.content))
+    assert table.column('id').to_pylist() == [1, 2]
+    assert str(table.schema.field('create_date').type) == 'timestamp[us]', (
+        'Колонки Parquet должны иметь типы колонок модели.'
+    )
+    assert table.column('close_date').to_pylist() == [None, None]
+
+
+def test_export_format_unavailable(superuser_client, monkeypatch):
+    from app.services import export
+    monkeypatch.setattr(export, 'pyarrow', None)
+    response = superuser_client.get(
+        '/export/report', params={'format': 'parquet'}
+    )
+    assert response.status_code == 400, (
+        'Формат без установленной зависимости должен быть недоступен.'
+    )
+    assert 'pyarrow' in response.json()['detail']
@@ -1,4 +1,8 @@
 import types
+
+from aiogoogle import Aiogoogle
+from aiogoogle.resource import GoogleAPI
+
 try:
     from app.core import google_client
 except (NameError, ImportError):
@@ -55,3 +59,61 @@ def test_connect():
         'Функция `google_client.get_service` должна возвращать асинхронный '
         'генератор.'
     )
+
+
+SHEETS_DOCUMENT = {
+    'name': 'sheets',
+    'version': 'v4',
+    'rootUrl': 'https://sheets.googleapis.com/',
+    'servicePath': '',
+    'resources': {},
+}
+
+
+def patch_discovery(monkeypatch):
+    downloads = []
+
+    async def discover(self, api_name, api_version=None, validate=False):
+        downloads.append((api_name, api_version))
+        return GoogleAPI(dict(SHEETS_DOCUMENT))
+
+    monkeypatch.setattr(Aiogoogle, 'discover', discover)
+    return downloads
+
+
+async def test_discovery_cache(monkeypatch):
+    downloads = patch_discovery(monkeypatch)
+    client = google_client.CachedAiogoogle()
+    first = await client.discover('sheets', 'v4')
+    second = await client.discover('sheets', 'v4')
+    assert downloads == [('sheets', 'v4')], (
+        'Discovery-документ должен загружаться один раз на процесс.'
+    )
+    assert first is second
+
+
+async def test_discovery_disk_cache(monkeypatch, tmp_path):
+    downloads = patch_discovery(monkeypatch)
+    await google_client.CachedAiogoogle(cache_dir=tmp_path).discover(
+        'sheets', 'v4'
+    )
+    api = await google_client.CachedAiogoogle(cache_dir=tmp_path).discover(
+        'sheets', 'v4'
+    )
+    assert downloads == [('sheets', 'v4')], (
+        'Сохраненный на диск discovery-документ не должен '
+        'загружаться повторно.'
+    )
+    assert api.discovery_document['rootUrl'] == SHEETS_DOCUMENT['rootUrl']
+
+
+async def test_shared_session():
+    client = google_client.CachedAiogoogle()
+    client.use_shared_session()
+    session = client.session_context.get()
+    client.use_shared_session()
+    assert client.session_context.get() is session, (
+        'Запросы к Google API должны использовать одну сессию aiohttp.'
+    )
+    await client.stop()
+    assert session.closed
@@ -0,0 +1,236 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from aiogoogle.excs import HTTPError, ValidationError
+from conftest import TestingSessionLocal
+from fixtures.google import REPORT_READER_EMAIL, GoogleError
+
+from app.models import ReportJob
+from app.schemas.report import ReportJobDB
+from app.services import google_api
+from app.services.reports import DatabaseReportJobBackend, report_jobs
+
+SPREADSHEET_URL = 'https://docs.google.com/spreadsheets/d/sheet-1'
+
+
+def wait_for_report(client, job_id):
+    for _ in range(100):
+        job = client.get(f'/google/jobs/{job_id}').json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'Отчет не сформирован: {job_id}')
+
+
+def get_value_ranges(fake_google):
+    return [
+        value_range
+        for update in fake_google.get_requests(
+            'sheets.spreadsheets.values.batchUpdate'
+        )
+        for value_range in update.json['data']
+    ]
+
+
+def get_report_rows(fake_google):
+    return [
+        row
+        for value_range in get_value_ranges(fake_google)
+        for row in value_range['values']
+    ]
+
+
+def get_row_count(fake_google):
+    (create,) = fake_google.get_requests('sheets.spreadsheets.create')
+    (sheet,) = create.json['sheets']
+    return sheet['properties']['gridProperties']['rowCount']
+
+
+def create_closed_projects(mixer, count):
+    for number in range(count):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {number}',
+            description=f'description {number}',
+            full_amount=100,
+            invested_amount=100,
+            fully_invested=True,
+            create_date=datetime(2010, 10, 10),
+            close_date=datetime(2010, 10, 11) + timedelta(minutes=number),
+        )
+
+
+def test_get_report(superuser_client, fake_google, closed_charity_project):
+    response = superuser_client.get('/google/')
+    assert response.status_code == 200
+    assert response.json() == SPREADSHEET_URL, (
+        'Отчет должен возвращать ссылку на созданный документ.'
+    )
+    assert get_report_rows(fake_google)[3] == [
+        'chimichangas4life', '1 day, 0:00:00',
+        'Huge fan of chimichangas. Wanna buy a lot',
+    ]
+    (permission,) = fake_google.get_requests('drive.permissions.create')
+    assert permission.params == {'fileId': 'sheet-1', 'fields': 'id'}
+    assert permission.json == {
+        'type': 'user', 'role': 'writer', 'emailAddress': REPORT_READER_EMAIL,
+    }, 'Доступ к отчету должен выдаваться пользователю из настроек.'
+
+
+def test_report_job(superuser_client, fake_google, closed_charity_project):
+    response = superuser_client.post('/google/jobs')
+    assert response.status_code == 202, (
+        'Задача на формирование отчета должна создаваться '
+        'со статус-кодом 202.'
+    )
+    job = response.json()
+    assert job['status'] in ('pending', 'running', 'done')
+    job = wait_for_report(superuser_client, job['id'])
+    assert job['status'] == 'done'
+    assert job['url'] == SPREADSHEET_URL, (
+        'Готовая задача должна содержать ссылку на отчет.'
+    )
+    assert get_report_rows(fake_google)[3][0] == 'chimichangas4life'
+
+
+def test_report_job_failed(superuser_client, fake_google):
+    fake_google.error = GoogleError(429, 'Quota exceeded')
+    job_id = superuser_client.post('/google/jobs').json()['id']
+    job = wait_for_report(superuser_client, job_id)
+    assert job['status'] == 'failed'
+    assert 'Quota exceeded' in job['error'], (
+        'Задача, завершившаяся ошибкой, должна сообщать ее причину.'
+    )
+
+
+def test_report_job_not_found(superuser_client, fake_google):
+    response = superuser_client.get('/google/jobs/unknown')
+    assert response.status_code == 404
+
+
+def test_report_job_shared_between_workers(
+        superuser_client, fake_google, closed_charity_project, monkeypatch
+):
+    monkeypatch.setattr(
+        report_jobs, 'backend',
+        DatabaseReportJobBackend(TestingSessionLocal, 3600),
+    )
+    job_id = superuser_client.post('/google/jobs').json()['id']
+    # Другой воркер: своя память, общая БД.
+    monkeypatch.setattr(
+        report_jobs, 'backend',
+        DatabaseReportJobBackend(TestingSessionLocal, 3600),
+    )
+    job = wait_for_report(superuser_client, job_id)
+    assert job['status'] == 'done', (
+        'Статус задачи из БД должен быть виден в любом воркере.'
+    )
+    assert job['url'] == SPREADSHEET_URL
+
+
+async def test_report_job_expired():
+    backend = DatabaseReportJobBackend(TestingSessionLocal, 60)
+    old_job = ReportJobDB(
+        id='old', status='done',
+        create_date=datetime.utcnow() - timedelta(minutes=2),
+    )
+    await backend.set(old_job)
+    assert await backend.get('old') is None, (
+        'Задача старше report_job_ttl не должна возвращаться.'
+    )
+    await backend.set(
+        ReportJobDB(id='new', status='pending', create_date=datetime.utcnow())
+    )
+    assert (await backend.get('new')).status == 'pending'
+    async with TestingSessionLocal() as session:
+        assert await session.get(ReportJob, 'old') is None, (
+            'Устаревшие задачи должны удаляться из БД.'
+        )
+
+
+def test_report_job_usual_user(user_client):
+    assert user_client.post('/google/jobs').status_code == 401
+
+
+def test_report_not_truncated(superuser_client, fake_google, mixer):
+    create_closed_projects(mixer, 40)
+    assert superuser_client.get('/google/').status_code == 200
+    rows = get_report_rows(fake_google)
+    assert len(rows) == google_api.HEADER_ROWS + 40, (
+        'Отчет должен содержать все закрытые проекты.'
+    )
+    assert rows[-1][0] == 'project 39'
+    assert get_row_count(fake_google) == google_api.HEADER_ROWS + 40, (
+        'Размер листа должен рассчитываться по числу проектов.'
+    )
+
+
+def test_report_top(superuser_client, fake_google, mixer):
+    create_closed_projects(mixer, 10)
+    assert superuser_client.get('/google/?top=4').status_code == 200
+    assert len(get_report_rows(fake_google)) == google_api.HEADER_ROWS + 4
+    assert get_row_count(fake_google) == google_api.HEADER_ROWS + 4
+
+
+def test_report_written_in_chunks(
+        superuser_client, fake_google, mixer, monkeypatch
+):
+    monkeypatch.setattr(google_api, 'MAX_REQUEST_ROWS', 3)
+    create_closed_projects(mixer, 7)
+    assert superuser_client.get('/google/').status_code == 200
+    updates = fake_google.get_requests('sheets.spreadsheets.values.batchUpdate')
+    assert len(updates) == 3, (
+        'Данные отчета должны записываться частями '
+        'не больше MAX_REQUEST_ROWS строк.'
+    )
+    assert [
+        value_range['range'] for value_range in get_value_ranges(fake_google)
+    ] == ['A1:C3', 'A4:C6', 'A7:C9', 'A10:C10']
+    assert [row[0] for row in get_report_rows(fake_google)[3:]] == [
+        f'project {number}' for number in range(7)
+    ]
+
+
+def test_report_chunks_limited_by_size(
+        superuser_client, fake_google, mixer, monkeypatch
+):
+    row_size = google_api.get_row_size(
+        ['project 0', '1 day, 0:00:00', 'description 0']
+    )
+    monkeypatch.setattr(google_api, 'MAX_REQUEST_BYTES', row_size * 2)
+    create_closed_projects(mixer, 4)
+    assert superuser_client.get('/google/').status_code == 200
+    assert len(
+        fake_google.get_requests('sheets.spreadsheets.values.batchUpdate')
+    ) == 2, 'Размер тела запроса не должен превышать MAX_REQUEST_BYTES.'
+
+
+def test_empty_report(superuser_client, fake_google):
+    assert superuser_client.get('/google/').status_code == 200
+    assert get_report_rows(fake_google)[2] == [
+        'Название проекта', 'Время сбора', 'Описание'
+    ]
+    assert len(fake_google.get_requests('drive.permissions.create')) == 1
+
+
+async def test_fake_google_validates_calls(fake_google):
+    client = fake_google.make_client()
+    sheets = await client.discover('sheets', 'v4')
+    with pytest.raises(ValidationError):
+        sheets.spreadsheets.values.batchUpdate(
+            spreadsheet_id='sheet-1', json={'data': []}
+        )
+    async with client:
+        with pytest.raises(HTTPError, match='неизвестные поля'), \
+                pytest.warns(UserWarning):
+            await client.as_service_account(
+                sheets.spreadsheets.values.batchUpdate(
+                    spreadsheetId='sheet-1',
+                    json={'valueInputOption': 'USER_ENTERED', 'values': []},
+                )
+            )
+    assert not fake_google.requests, (
+        'Локальный сервер Google должен отклонять вызовы, '
+        'не соответствующие discovery-документу.'
+    )
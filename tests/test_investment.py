@@ -53,3 +53,83 @@ def test_donation_to_little_invest_project(user_client, charity_project_little_i
     )
     assert not charity_project_nunchaku.fully_invested, common_asser_msg
     assert charity_project_nunchaku.invested_amount == 0, common_asser_msg
+
+
+def test_donation_closes_several_projects_in_order(user_client, mixer):
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}',
+            description='Project for allocation',
+            full_amount=100,
+        )
+        for number in range(4)
+    ]
+    response = user_client.post('/donation/', json={'full_amount': 250})
+    assert response.status_code == 200
+    common_asser_msg = (
+        'Создано 4 проекта по 100. Пожертвование 250 должно закрыть два '
+        'первых проекта, наполовину наполнить третий и не затронуть '
+        'четвертый.'
+    )
+    assert [project.invested_amount for project in projects] == [
+        100, 100, 50, 0
+    ], common_asser_msg
+    assert [project.fully_invested for project in projects] == [
+        True, True, False, False
+    ], common_asser_msg
+    assert projects[0].close_date is not None, common_asser_msg
+    assert projects[2].close_date is None, common_asser_msg
+
+
+def test_project_collects_several_donations(superuser_client, mixer):
+    donations = [
+        mixer.blend(
+            'app.models.donation.Donation',
+            user_id=2,
+            full_amount=full_amount,
+        )
+        for full_amount in (30, 30, 30)
+    ]
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'Мертвый Бассейн',
+        'description': 'Deadpool inside',
+        'full_amount': 70,
+    })
+    data = response.json()
+    common_asser_msg = (
+        'Созданы 3 пожертвования по 30. Проект на 70 должен полностью '
+        'забрать два первых пожертвования и 10 из третьего.'
+    )
+    assert data['invested_amount'] == 70, common_asser_msg
+    assert data['fully_invested'], common_asser_msg
+    assert [donation.invested_amount for donation in donations] == [
+        30, 30, 10
+    ], common_asser_msg
+    assert [donation.fully_invested for donation in donations] == [
+        True, True, False
+    ], common_asser_msg
+
+
+def test_donation_allocated_across_pages(user_client, mixer, monkeypatch):
+    monkeypatch.setattr(
+        'app.crud.charity_project.charity_project_crud.'
+        'open_objects_page_size',
+        2
+    )
+    projects = [
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project_{number}',
+            description='Project for allocation',
+            full_amount=100,
+        )
+        for number in range(5)
+    ]
+    user_client.post('/donation/', json={'full_amount': 350})
+    assert [project.invested_amount for project in projects] == [
+        100, 100, 100, 50, 0
+    ], (
+        'Открытые проекты должны читаться постранично и заполняться '
+        'в порядке создания, пока не распределена вся сумма пожертвования.'
+    )
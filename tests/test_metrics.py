@@ -0,0 +1,89 @@
+import re
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import request_metrics
+
+
+@pytest.fixture
+def metrics_enabled(monkeypatch):
+    monkeypatch.setattr(settings, 'metrics_enabled', True)
+    request_metrics.reset()
+    yield
+    request_metrics.reset()
+
+
+def parse_server_timing(header):
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r'(\w+);dur=([\d.]+)', header)
+    }
+
+
+def get_metric(text, name, **labels):
+    label_text = ','.join(
+        f'{key}="{value}"' for key, value in labels.items()
+    )
+    match = re.search(
+        rf'^{name}{{{re.escape(label_text)}}} (\S+)$', text, re.MULTILINE
+    )
+    assert match is not None, f'Метрика {name}{{{label_text}}} не найдена.'
+    return float(match.group(1))
+
+
+def test_metrics_disabled(user_client):
+    response = user_client.post('/donation/', json={'full_amount': 10})
+    assert 'server-timing' not in response.headers, (
+        'Без settings.metrics_enabled запросы не должны инструментироваться.'
+    )
+    assert user_client.get('/metrics').status_code == 404
+
+
+def test_server_timing(user_client, metrics_enabled):
+    response = user_client.post('/donation/', json={'full_amount': 10})
+    assert response.status_code == 200
+    header = response.headers['server-timing']
+    timings = parse_server_timing(header)
+    assert set(timings) == {'app', 'db'}, (
+        'Заголовок Server-Timing должен содержать общее время и время БД.'
+    )
+    assert 0 < timings['db'] <= timings['app']
+    queries = int(re.search(r'(\d+) queries', header).group(1))
+    assert queries > 0, 'Заголовок должен содержать число SQL-запросов.'
+
+
+def test_metrics_by_route(superuser_client, metrics_enabled,
+                          charity_project, charity_project_nunchaku):
+    superuser_client.get('/charity_project/')
+    superuser_client.get('/charity_project/')
+    superuser_client.delete('/charity_project/2')
+    text = superuser_client.get('/metrics').text
+    list_labels = {
+        'method': 'GET', 'route': '/charity_project/', 'status': '200'
+    }
+    assert get_metric(
+        text, 'http_request_duration_seconds_count', **list_labels
+    ) == 2, 'Гистограммы должны вестись по маршрутам.'
+    assert get_metric(
+        text, 'http_request_db_rows_sum', **list_labels
+    ) >= 2, 'Должны учитываться строки, выбранные из БД.'
+    assert get_metric(
+        text, 'http_request_sql_statements_count',
+        method='DELETE', route='/charity_project/{charity_project_id}',
+        status='200',
+    ) == 1, 'Маршрут должен указываться шаблоном пути, а не самим путем.'
+
+
+def test_metrics_histogram_buckets(user_client, metrics_enabled):
+    user_client.post('/donation/', json={'full_amount': 10})
+    text = user_client.get('/metrics').text
+    labels = {'method': 'POST', 'route': '/donation/', 'status': '200'}
+    assert get_metric(
+        text, 'http_request_duration_seconds_bucket', **labels, le='+Inf'
+    ) == 1
+    statements = get_metric(text, 'http_request_sql_statements_sum', **labels)
+    assert get_metric(
+        text, 'http_request_sql_statements_bucket', **labels, le='0'
+    ) == 0
+    assert statements > 0
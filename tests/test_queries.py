@@ -0,0 +1,75 @@
+import re
+
+
+def statements_for(statements, table_name):
+    return [
+        statement.split()[0]
+        for statement in statements
+        if re.search(rf'\b{table_name}\b', statement)
+    ]
+
+
+def test_create_donation_single_round_trip(user_client, charity_project,
+                                           sql_statements):
+    response = user_client.post('/donation/', json={'full_amount': 100})
+    assert response.status_code == 200
+    assert response.json()['id'] == 1
+    assert statements_for(sql_statements, 'donation') == ['INSERT'], (
+        'Создание пожертвования должно записывать строку одним запросом '
+        'без повторного чтения после фиксации.'
+    )
+    assert [statement.split()[0] for statement in sql_statements] == [
+        'BEGIN', 'SELECT', 'UPDATE', 'UPDATE', 'INSERT'
+    ], (
+        'Распределение и запись пожертвования должны обходиться '
+        'блокировкой, выборкой открытых проектов, обновлением проекта '
+        'и статистики и вставкой пожертвования.'
+    )
+
+
+def test_create_project_not_reread(superuser_client, sql_statements):
+    response = superuser_client.post('/charity_project/', json={
+        'name': 'chimichangas4life',
+        'description': 'Huge fan of chimichangas. Wanna buy a lot',
+        'full_amount': 1000,
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data['invested_amount'] == 0
+    assert data['create_date'] is not None, (
+        'Значения по умолчанию должны возвращаться без повторного чтения '
+        'строки.'
+    )
+    assert statements_for(
+        sql_statements, 'charityproject'
+    )[-1:] == ['INSERT'], (
+        'После создания проекта строка не должна перечитываться из БД.'
+    )
+
+
+def test_patch_project_not_reread(superuser_client, charity_project,
+                                  sql_statements):
+    response = superuser_client.patch(
+        '/charity_project/1', json={'description': 'new description'}
+    )
+    assert response.status_code == 200
+    assert response.json()['description'] == 'new description'
+    assert statements_for(
+        sql_statements, 'charityproject'
+    )[-1:] == ['UPDATE'], (
+        'После изменения проекта строка не должна перечитываться из БД.'
+    )
+
+
+def test_patch_project_statements(superuser_client, charity_project,
+                                  sql_statements):
+    response = superuser_client.patch(
+        '/charity_project/1', json={'name': 'new name'}
+    )
+    assert response.status_code == 200
+    assert [statement.split()[0] for statement in sql_statements] == [
+        'SELECT', 'UPDATE'
+    ], (
+        'Изменение названия проекта должно выполняться чтением проекта '
+        'и одним UPDATE: уникальность названия проверяет БД.'
+    )
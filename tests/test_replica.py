@@ -0,0 +1,99 @@
+import pytest
+
+from conftest import TestingSessionLocal
+from app.core import db
+from app.core.cache import charity_project_list_cache
+
+AUTHORIZATION = {'Authorization': 'Bearer writer-token'}
+
+
+class ReplicaSessionFactory:
+    def __init__(self):
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        session = TestingSessionLocal()
+        session.info[db.REPLICA_SESSION] = True
+        return session
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    factory = ReplicaSessionFactory()
+    monkeypatch.setattr(db, 'AsyncReadSessionLocal', factory)
+    db.replica_lag_guard.recent_writers.clear()
+    yield factory
+    db.replica_lag_guard.recent_writers.clear()
+
+
+def test_lists_read_from_replica(replica, user_client, charity_project):
+    response = user_client.get('/charity_project/')
+    assert response.status_code == 200
+    assert user_client.get('/donation/my').status_code == 200
+    assert replica.opened == 2, (
+        'Если задана реплика, списки должны читаться с нее.'
+    )
+
+
+def test_writes_go_to_primary(replica, user_client):
+    response = user_client.post(
+        '/donation/', json={'full_amount': 100}, headers=AUTHORIZATION
+    )
+    assert response.status_code == 200
+    assert replica.opened == 0, 'Запись не должна идти в реплику.'
+
+
+def test_recent_writer_reads_from_primary(replica, user_client):
+    user_client.post(
+        '/donation/', json={'full_amount': 100}, headers=AUTHORIZATION
+    )
+    response = user_client.get('/donation/my', headers=AUTHORIZATION)
+    assert len(response.json()) == 1
+    assert replica.opened == 0, (
+        'Клиент, только что записавший данные, должен читать '
+        'из основной БД, пока реплика может отставать.'
+    )
+    user_client.get(
+        '/donation/my', headers={'Authorization': 'Bearer other-token'}
+    )
+    assert replica.opened == 1, (
+        'Другие клиенты должны продолжать читать с реплики.'
+    )
+
+
+def test_replica_page_not_cached_after_invalidation(replica, user_client,
+                                                    charity_project):
+    user_client.post('/donation/', json={'full_amount': 100})
+    user_client.get('/charity_project/')
+    assert replica.opened == 1
+    assert not charity_project_list_cache.backend.storage, (
+        'Страница, прочитанная с реплики сразу после сброса кэша, '
+        'не должна кэшироваться.'
+    )
+
+
+async def test_writer_marked_before_response_sent(replica):
+    async def write_app(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200})
+        await send({'type': 'http.response.body', 'body': b'{}'})
+
+    marked_on_send = []
+
+    async def send(message):
+        marked_on_send.append(db.replica_lag_guard.wrote_recently(
+            AUTHORIZATION['Authorization']
+        ))
+
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'headers': [
+            (b'authorization', AUTHORIZATION['Authorization'].encode())
+        ],
+    }
+    await db.ReplicaLagMiddleware(write_app)(scope, None, send)
+    assert marked_on_send == [True, True], (
+        'Автор изменения должен отмечаться до того, как ответ '
+        'уйдет клиенту.'
+    )
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from conftest import TestingSessionLocal
+from app.crud.charity_project import charity_project_crud
+
+START = datetime(2010, 10, 10)
+DURATIONS = [
+    timedelta(days=10),
+    timedelta(days=2),
+    timedelta(hours=5, seconds=30),
+    timedelta(days=2, microseconds=1),
+]
+
+
+def create_closed_projects(mixer):
+    for number, duration in enumerate(DURATIONS):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {number}',
+            description=f'description {number}',
+            full_amount=100,
+            invested_amount=100,
+            fully_invested=True,
+            create_date=START,
+            close_date=START + duration,
+        )
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='open project',
+        description='still collecting',
+        full_amount=100,
+        invested_amount=0,
+        fully_invested=False,
+        create_date=START,
+        close_date=None,
+    )
+
+
+async def get_report(limit=None):
+    async with TestingSessionLocal() as session:
+        return await charity_project_crud.get_projects_by_completion_rate(
+            session, limit=limit
+        )
+
+
+async def test_report_sorted_by_duration(mixer):
+    create_closed_projects(mixer)
+    report = await get_report()
+    assert [project['period'] for project in report] == [
+        str(duration) for duration in sorted(DURATIONS)
+    ], (
+        'Отчет должен содержать только закрытые проекты, отсортированные '
+        'по длительности сбора, а не по ее строковому представлению.'
+    )
+    assert report[0] == {
+        'name': 'project 2',
+        'period': '5:00:30',
+        'description': 'description 2',
+    }
+
+
+async def test_report_limit(mixer):
+    create_closed_projects(mixer)
+    report = await get_report(limit=2)
+    assert [project['name'] for project in report] == [
+        'project 2', 'project 1'
+    ], 'Отчет должен ограничиваться самыми быстро закрытыми проектами.'
+
+
+async def test_report_streamed_in_chunks(mixer):
+    create_closed_projects(mixer)
+    async with TestingSessionLocal() as session:
+        chunks = [
+            chunk async for chunk in
+            charity_project_crud.iter_projects_by_completion_rate(
+                session, chunk_size=3
+            )
+        ]
+        count = await charity_project_crud.count_closed_projects(session)
+    assert [len(chunk) for chunk in chunks] == [3, 1], (
+        'Проекты для отчета должны читаться из БД частями.'
+    )
+    assert [project for chunk in chunks for project in chunk] == (
+        await get_report()
+    )
+    assert count == len(DURATIONS)
@@ -0,0 +1,154 @@
+import asyncio
+
+from conftest import TestingSessionLocal
+from test_allocation import background_allocation, wait_for_allocation  # noqa
+from test_concurrency import create_donation
+
+from app.crud.fund_stats import fund_stats_crud
+
+
+def create_project(client, name, full_amount):
+    response = client.post('/charity_project/', json={
+        'name': name,
+        'description': 'Deadpool inside',
+        'full_amount': full_amount,
+    })
+    return response.json()['id']
+
+
+def assert_consistent(client):
+    check = client.get('/stats/check').json()
+    assert check == {'consistent': True, 'mismatches': {}}, (
+        'Статистика фонда должна совпадать с данными проектов '
+        'и пожертвований.'
+    )
+
+
+def test_stats_follow_writes(superuser_donor):
+    create_project(superuser_donor, 'first', 1000)
+    create_project(superuser_donor, 'second', 500)
+    superuser_donor.post('/donation/', json={'full_amount': 1200})
+    third_id = create_project(superuser_donor, 'third', 300)
+    superuser_donor.delete(f'/charity_project/{third_id}')
+    superuser_donor.patch('/charity_project/2', json={'full_amount': 600})
+    superuser_donor.post('/donation/', json={'full_amount': 400})
+    create_project(superuser_donor, 'fourth', 200)
+    response = superuser_donor.get('/stats/')
+    assert response.status_code == 200
+    assert response.json() == {
+        'project_count': 3,
+        'open_project_count': 1,
+        'requested_amount': 1800,
+        'donation_count': 2,
+        'donated_amount': 1600,
+        'invested_amount': 1600,
+        'unallocated_amount': 0,
+    }, (
+        'Статистика фонда должна обновляться при создании, изменении '
+        'и удалении объектов и при распределении инвестиций.'
+    )
+    assert_consistent(superuser_donor)
+
+
+def test_stats_follow_background_allocation(background_allocation,
+                                            superuser_donor):
+    create_project(superuser_donor, 'first', 1000)
+    donation_id = superuser_donor.post(
+        '/donation/', json={'full_amount': 1500}
+    ).json()['id']
+    wait_for_allocation(
+        superuser_donor, f'/allocation/donation/{donation_id}'
+    )
+    data = superuser_donor.get('/stats/').json()
+    assert data['open_project_count'] == 0
+    assert data['unallocated_amount'] == 500, (
+        'Фоновое распределение должно обновлять статистику фонда.'
+    )
+    assert_consistent(superuser_donor)
+
+
+def test_stats_check_and_rebuild(superuser_client, charity_project,
+                                 donation):
+    check = superuser_client.get('/stats/check').json()
+    assert not check['consistent'], (
+        'Проверка должна находить объекты, не учтенные в статистике.'
+    )
+    assert check['mismatches']['donated_amount'] == {
+        'stored': 0, 'actual': 100,
+    }
+    response = superuser_client.post('/stats/rebuild')
+    assert response.status_code == 200
+    assert response.json()['project_count'] == 1
+    assert response.json()['unallocated_amount'] == 100
+    assert_consistent(superuser_client)
+
+
+def test_stats_rebuild_forbidden_for_user(user_client):
+    response = user_client.post('/stats/rebuild')
+    assert response.status_code == 401, (
+        'Пересчитывать статистику может только суперюзер.'
+    )
+
+
+def test_stats_follow_project_closed_by_patch(superuser_donor):
+    create_project(superuser_donor, 'first', 1000)
+    superuser_donor.post('/donation/', json={'full_amount': 300})
+    superuser_donor.patch('/charity_project/1', json={'full_amount': 300})
+    data = superuser_donor.get('/stats/').json()
+    assert data['open_project_count'] == 0, (
+        'Проект, закрытый изменением требуемой суммы, не должен '
+        'учитываться как открытый.'
+    )
+    assert data['requested_amount'] == 300
+    assert_consistent(superuser_donor)
+
+
+async def test_stats_rebuild_with_concurrent_write(monkeypatch, mixer):
+    mixer.blend(
+        'app.models.charity_project.CharityProject',
+        name='first', description='Deadpool inside', full_amount=1000,
+    )
+    async with TestingSessionLocal() as session:
+        await fund_stats_crud.rebuild(session)
+    calculate = fund_stats_crud.calculate
+    calculated = asyncio.Event()
+    resume = asyncio.Event()
+
+    async def slow_calculate(session):
+        actual = await calculate(session)
+        calculated.set()
+        await resume.wait()
+        return actual
+
+    monkeypatch.setattr(fund_stats_crud, 'calculate', slow_calculate)
+
+    async def rebuild():
+        async with TestingSessionLocal() as session:
+            await fund_stats_crud.rebuild(session)
+
+    rebuild_task = asyncio.create_task(rebuild())
+    await calculated.wait()
+    donation_task = asyncio.create_task(create_donation(300))
+    await asyncio.sleep(0.1)
+    resume.set()
+    await asyncio.gather(rebuild_task, donation_task)
+    monkeypatch.undo()
+    async with TestingSessionLocal() as session:
+        assert await fund_stats_crud.check(session) == {}, (
+            'Изменения, зафиксированные во время пересчета статистики, '
+            'не должны теряться.'
+        )
+
+
+def test_project_row_deleted_before_stats_update(superuser_client,
+                                                 charity_project,
+                                                 sql_statements):
+    superuser_client.delete(f'/charity_project/{charity_project.id}')
+    writes = [
+        statement.split()[0] for statement in sql_statements
+        if statement.startswith(('DELETE', 'UPDATE'))
+    ]
+    assert writes == ['DELETE', 'UPDATE'], (
+        'При удалении проекта его строка должна блокироваться раньше '
+        'строки статистики фонда, как при распределении инвестиций.'
+    )
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from app.core import tracing
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    previous = tracing.set_tracer(tracing.OtlpFileTracer(str(path)))
+    yield path
+    tracing.set_tracer(previous)
+
+
+def read_spans(path):
+    tracing.get_tracer().close()
+    spans = []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        for resource_spans in json.loads(line)['resourceSpans']:
+            for scope_spans in resource_spans['scopeSpans']:
+                spans.extend(scope_spans['spans'])
+    return spans
+
+
+def get_attributes(span):
+    return {
+        attribute['key']: next(iter(attribute['value'].values()))
+        for attribute in span['attributes']
+    }
+
+
+def test_noop_tracer():
+    tracer = tracing.Tracer()
+    with tracer.span('allocate', model='donation') as span:
+        span.add('rows_examined')
+    assert span is tracing.NOOP_SPAN, (
+        'По умолчанию интервалы не должны записываться.'
+    )
+
+
+def test_allocation_spans(user_client, trace_file, mixer):
+    for number, full_amount in enumerate((1000, 5000)):
+        mixer.blend(
+            'app.models.charity_project.CharityProject',
+            name=f'project {number}',
+            full_amount=full_amount,
+            invested_amount=0,
+            fully_invested=False,
+        )
+    response = user_client.post('/donation/', json={'full_amount': 1500})
+    assert response.status_code == 200
+    spans = read_spans(trace_file)
+    by_name = {span['name']: span for span in spans}
+    assert {
+        'make_investments', 'allocate', 'fetch', 'persist', 'commit'
+    } <= set(by_name), (
+        'Распределение должно записывать интервалы выборки, '
+        'распределения и сохранения.'
+    )
+    root = by_name['make_investments']
+    assert root['parentSpanId'] == ''
+    assert by_name['allocate']['parentSpanId'] == root['spanId']
+    assert by_name['persist']['parentSpanId'] == root['spanId']
+    assert by_name['fetch']['parentSpanId'] == (
+        by_name['allocate']['spanId']
+    ), 'Выборка открытых объектов должна быть вложена в распределение.'
+    assert len({
+        by_name[name]['traceId']
+        for name in ('make_investments', 'allocate', 'fetch', 'persist')
+    }) == 1
+    assert get_attributes(by_name['fetch'])['rows_examined'] == '2'
+    assert get_attributes(by_name['allocate'])['rows_examined'] == '2'
+    assert get_attributes(by_name['allocate'])['rows_modified'] == '1'
+    assert get_attributes(by_name['persist'])['rows_modified'] == '1', (
+        'Интервал сохранения должен считать закрытые объекты.'
+    )
+    for span in spans:
+        assert int(span['endTimeUnixNano']) >= int(span['startTimeUnixNano'])
+
+
+def test_span_error_status(trace_file):
+    with pytest.raises(ValueError):
+        with tracing.start_span('allocate'):
+            raise ValueError('conflict')
+    (span,) = read_spans(trace_file)
+    assert span['status']['code'] == tracing.STATUS_CODE_ERROR